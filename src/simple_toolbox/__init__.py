@@ -5,11 +5,13 @@ from simple_toolbox import http_util, json_util, list_util, path_util
 from simple_toolbox import pickle_util, rest_util, str_util, sys_util
 from simple_toolbox import yaml_util, zip_util, class_util, math_util
 from simple_toolbox import crypto_util, df_util, dt_util, hash_util, ocr_util
+from simple_toolbox import file_util
 
 __all__ = [
     "crypto_util",
     "df_util",
     "dt_util",
+    "file_util",
     "hash_util",
     "http_util",
     "json_util",
@@ -30,6 +32,7 @@ __all__ = [
     crypto_util,
     df_util,
     dt_util,
+    file_util,
     hash_util,
     http_util,
     json_util,
@@ -4,46 +4,42 @@ from os import listdir as os_listdir
 cimport cython
 
 ### Clean Path
-cdef str _clean_path(str path, str os_sep):
-    cdef:
-        str bslash = "\\"
-        str fslash = "/"
-        str colon = ":"
-        str star = "*"
-        str quest = "?"
-        str quote = "\""
-        str lt = "<"
-        str gt = ">"
-        str pipe = "|"
-        str nil = ""
+# Translation tables keyed by os separator: both slashes are
+# mapped to the separator and the invalid characters are dropped.
+cdef dict _CLEAN_TABLES = {}
+
+cdef dict _clean_table(str os_sep):
+    cdef dict table = _CLEAN_TABLES.get(os_sep)
 
+    if table is None:
+        table = {ord(c): None for c in ':*?"<>|'}
+        table[ord("\\")] = os_sep
+        table[ord("/")] = os_sep
+        _CLEAN_TABLES[os_sep] = table
+    return table
+
+cdef inline str _clean_path(str path, str os_sep):
     if not path:
         return path
-
-    if bslash in path and bslash != os_sep:
-        path = path.replace(bslash, os_sep)
-    if fslash in path and fslash != os_sep:
-        path = path.replace(fslash, os_sep)
-    if colon in path:
-        path = path.replace(colon, nil)
-    if star in path:
-        path = path.replace(star, nil)
-    if quest in path:
-        path = path.replace(quest, nil)
-    if quote in path:
-        path = path.replace(quote, nil)
-    if lt in path:
-        path = path.replace(lt, nil)
-    if gt in path:
-        path = path.replace(gt, nil)
-    if pipe in path:
-        path = path.replace(pipe, nil)
-    
-    return path
+    return path.translate(_clean_table(os_sep))
 
 cpdef str clean_path(str path, str os_sep):
     return _clean_path(path, os_sep)
 
+@cython.boundscheck(False)  # Deactivate bounds checking
+@cython.wraparound(False)   # Deactivate negative indexing
+cpdef list clean_paths(list paths, str os_sep):
+    cdef:
+        dict table = _clean_table(os_sep)
+        Py_ssize_t i, count = len(paths)
+        list res = [None] * count
+        str path
+
+    for i in range(count):
+        path = paths[i]
+        res[i] = path.translate(table) if path else path
+    return res
+
 ### Offset path
 cpdef str offset_path(str path, int offset, str os_sep):
     cdef int zero = 0
@@ -61,22 +57,15 @@ cpdef str offset_path(str path, int offset, str os_sep):
         return os_sep.join(paths[:offset])
 
 ### List Directory
+cdef frozenset _DEFAULT_EXCLUDES = frozenset((".DS_Store", "Thumbs.db", "desktop.ini", ".git", ".gitignore"))
+
+cpdef frozenset default_excludes():
+    return _DEFAULT_EXCLUDES
+
 @cython.boundscheck(False)  # Deactivate bounds checking
 cpdef list list_directory(str path, tuple excludes):
     cdef:
-        tuple dft_excludes = (".DS_Store", "Thumbs.db", "desktop.ini", ".git", ".gitignore")
-        list files = []
+        frozenset excl = frozenset(excludes) if excludes else _DEFAULT_EXCLUDES
         str f
 
-    if not excludes:
-        excludes = dft_excludes
-
-    cdef list dir_files = os_listdir(path)
-    if not dir_files:
-        return []
-
-    for f in dir_files:
-        if f not in excludes and not f.startswith("._"):
-            files.append(f)
-
-    return files
+    return [f for f in os_listdir(path) if f not in excl and not f.startswith("._")]
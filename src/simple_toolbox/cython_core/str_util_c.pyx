@@ -1,9 +1,13 @@
 # cython: language_level=3
 
 cimport cython
-from re import sub as _re_sub
-from re import compile as _re_compile
-from re import MULTILINE as _RE_MULTILINE
+from libc.stdlib cimport malloc, free
+from libc.string cimport memcmp, memcpy, memmove
+from libc.stdint cimport int32_t, int64_t
+from cpython.unicode cimport Py_UNICODE_TODECIMAL, Py_UNICODE_ISSPACE
+
+cdef extern from "Python.h":
+    double PyOS_string_to_double(const char *s, char **endptr, object overflow_exception) except? -1.0
 
 ### Extract Float
 cdef str _extract_float(str float_str, bint signed):
@@ -65,6 +69,203 @@ cpdef double parce_pct(str pct_str, bint signed) except *:
     cdef str res = _extract_float(pct_str, signed)
     return float(res) / 100
 
+### Parse locale-formatted float
+# Character classes
+cdef enum:
+    _C_OTHER = 0
+    _C_DIGIT = 1
+    _C_SKIP = 2
+    _C_MINUS = 3
+    _C_DOT = 4
+    _C_COMMA = 5
+    _C_APOS = 6
+    _C_ARABIC_DEC = 7
+    _C_ARABIC_GROUP = 8
+    _C_AUTO = -1
+
+cdef unsigned char _ASCII_CLASS[128]
+cdef int _c
+for _c in range(128):
+    _ASCII_CLASS[_c] = _C_OTHER
+for _c in range(48, 58):
+    _ASCII_CLASS[_c] = _C_DIGIT
+for _c in b" \t\n\r\x0b\x0c+$)":
+    _ASCII_CLASS[_c] = _C_SKIP
+_ASCII_CLASS[b"-"] = _C_MINUS
+_ASCII_CLASS[b"("] = _C_MINUS
+_ASCII_CLASS[b"."] = _C_DOT
+_ASCII_CLASS[b","] = _C_COMMA
+_ASCII_CLASS[b"'"] = _C_APOS
+
+# Non-ASCII characters other than unicode digits, spaces &
+# the currency block (U+20A0 - U+20CF)
+cdef dict _UNICODE_CLASS = {
+    0x00A2: _C_SKIP,  # ¢
+    0x00A3: _C_SKIP,  # £
+    0x00A4: _C_SKIP,  # ¤
+    0x00A5: _C_SKIP,  # ¥
+    0xFF04: _C_SKIP,  # ＄
+    0xFFE0: _C_SKIP,  # ￠
+    0xFFE1: _C_SKIP,  # ￡
+    0xFFE5: _C_SKIP,  # ￥
+    0xFF0B: _C_SKIP,  # ＋
+    0xFF09: _C_SKIP,  # ）
+    0xFF08: _C_MINUS,  # （
+    0x2212: _C_MINUS,  # −
+    0xFF0D: _C_MINUS,  # －
+    0xFF0E: _C_DOT,  # ．
+    0xFF0C: _C_COMMA,  # ，
+    0x2019: _C_APOS,  # ’
+    0xFF07: _C_APOS,  # ＇
+    0x066B: _C_ARABIC_DEC,  # ٫
+    0x066C: _C_ARABIC_GROUP,  # ٬
+}
+
+# Locale: (decimal separator class, grouping separator classes bitmask)
+cdef dict _LOCALE_SEPARATORS = {
+    "en": (_C_DOT, 1 << _C_COMMA),
+    "eu": (_C_COMMA, 1 << _C_DOT),
+    "fr": (_C_COMMA, 0),
+    "ch": (_C_DOT, 1 << _C_APOS),
+    "ar": (_C_ARABIC_DEC, 1 << _C_ARABIC_GROUP),
+    "auto": (_C_AUTO, 1 << _C_APOS | 1 << _C_ARABIC_GROUP),
+}
+
+cdef inline int _char_class(Py_UCS4 ch, int* digit):
+    cdef long code = ch
+
+    if code < 128:
+        if _ASCII_CLASS[code] == _C_DIGIT:
+            digit[0] = code - 48
+        return _ASCII_CLASS[code]
+
+    digit[0] = Py_UNICODE_TODECIMAL(ch)
+    if digit[0] >= 0:
+        return _C_DIGIT
+    if Py_UNICODE_ISSPACE(ch) or 0x20A0 <= code <= 0x20CF:
+        return _C_SKIP
+    return _UNICODE_CLASS.get(code, _C_OTHER)
+
+@cython.boundscheck(False)  # Deactivate bounds checking
+@cython.wraparound(False)   # Deactivate negative indexing
+cdef double _parse_locale_float(str text, int dec_cls, int group_mask, bint signed, char* buf) except? -1.0:
+    cdef:
+        Py_ssize_t i, n = len(text)
+        Py_ssize_t pos = 1  # buf[0] is reserved for the sign
+        Py_ssize_t dec_pos = -1
+        Py_ssize_t dot_pos = -1, comma_pos = -1
+        int dot_n = 0, comma_n = 0, last_sep = _C_OTHER
+        int cls, digit
+        bint neg = False
+        Py_UCS4 ch
+
+    for i in range(n):
+        ch = text[i]
+        cls = _char_class(ch, &digit)
+        if cls == _C_DIGIT:
+            buf[pos] = 48 + digit
+            pos += 1
+        elif cls == _C_SKIP:
+            continue
+        elif cls == _C_MINUS:
+            neg = True
+        elif cls == _C_OTHER:
+            raise ValueError("unexpected character %r in '%s'" % (ch, text))
+        elif cls == dec_cls or (dec_cls == _C_AUTO and cls == _C_ARABIC_DEC):
+            if dec_pos != -1:
+                raise ValueError("multiple decimal separators in '%s'" % text)
+            dec_pos = pos
+        elif group_mask >> cls & 1:
+            continue
+        elif dec_cls == _C_AUTO and cls == _C_DOT:
+            dot_n += 1
+            dot_pos = pos
+            last_sep = cls
+        elif dec_cls == _C_AUTO and cls == _C_COMMA:
+            comma_n += 1
+            comma_pos = pos
+            last_sep = cls
+        else:
+            raise ValueError("unexpected separator %r in '%s'" % (ch, text))
+
+    if pos == 1:
+        raise ValueError("no digits in '%s'" % text)
+
+    # Auto: the rightmost of "." & "," is the decimal separator when
+    # both appear, a single kind is the decimal separator only when
+    # it appears exactly once.
+    if dec_pos == -1 and (dot_n or comma_n):
+        if not comma_n or (dot_n and last_sep == _C_DOT):
+            if dot_n == 1:
+                dec_pos = dot_pos
+            elif comma_n:
+                raise ValueError("multiple decimal separators in '%s'" % text)
+        elif comma_n == 1:
+            dec_pos = comma_pos
+        elif dot_n:
+            raise ValueError("multiple decimal separators in '%s'" % text)
+
+    if dec_pos != -1:
+        memmove(buf + dec_pos + 1, buf + dec_pos, pos - dec_pos)
+        buf[dec_pos] = 46  # "."
+        pos += 1
+    buf[pos] = 0
+
+    if signed and neg:
+        buf[0] = 45  # "-"
+        return PyOS_string_to_double(buf, NULL, None)
+    return PyOS_string_to_double(buf + 1, NULL, None)
+
+cdef tuple _locale_separators(str locale):
+    try:
+        return _LOCALE_SEPARATORS[locale]
+    except KeyError:
+        raise ValueError("unsupported locale '%s', available locales: %s" % (locale, ", ".join(_LOCALE_SEPARATORS)))
+
+cpdef double parse_locale_float(str text, str locale, bint signed) except *:
+    if not text:
+        raise ValueError("provided text is empty")
+
+    cdef:
+        int dec_cls, group_mask
+        char* buf = <char*> malloc(len(text) + 3)
+
+    if buf == NULL:
+        raise MemoryError()
+    try:
+        dec_cls, group_mask = _locale_separators(locale)
+        return _parse_locale_float(text, dec_cls, group_mask, signed, buf)
+    finally:
+        free(buf)
+
+@cython.boundscheck(False)  # Deactivate bounds checking
+@cython.wraparound(False)   # Deactivate negative indexing
+cpdef list parse_locale_floats(list texts, str locale, bint signed):
+    cdef:
+        int dec_cls, group_mask
+        Py_ssize_t i, width = 0, count = len(texts)
+        list res = [None] * count
+        object text
+        char* buf
+
+    dec_cls, group_mask = _locale_separators(locale)
+    for text in texts:
+        if text is not None and len(text) > width:
+            width = len(<str> text)
+
+    buf = <char*> malloc(width + 3)
+    if buf == NULL:
+        raise MemoryError()
+    try:
+        for i in range(count):
+            text = texts[i]
+            if text is not None:
+                res[i] = _parse_locale_float(text, dec_cls, group_mask, signed, buf)
+    finally:
+        free(buf)
+
+    return res
+
 ### Relpace Charactors for string
 cdef str _replace_char_iterative(str string, str targ_char, str repl_char):
     while targ_char in string:
@@ -129,42 +330,318 @@ cpdef str extract_alphanumeric_underscore(str string):
     return output_bytes.decode('utf-8')
 
 ### Reomve indent
-_ONLY_WHITESPACE_RE = _re_compile("^[ \t]+$", _RE_MULTILINE)
-_LEAD_WHITESPACE_RE = _re_compile("(^[ \t]*)(?:[^ \t\n])", _RE_MULTILINE)
+@cython.boundscheck(False)  # Deactivate bounds checking
 @cython.wraparound(False)   # Deactivate negative indexing
 cpdef str remove_indent(str text):
     cdef:
-        str margin = "$NONE$"
-        str indent
-        int i
-        str x
-        str y
-
-    # Look for the longest leading string of spaces and tabs common to all lines.
-    text = _ONLY_WHITESPACE_RE.sub("", text)
-    cdef list indents = _LEAD_WHITESPACE_RE.findall(text)
-    for indent in indents:
-        if margin == "$NONE$":
-            margin = indent
-
-        # Current line more deeply indented than previous winner:
-        # no change (previous winner is still on top).
-        elif indent.startswith(margin):
-            pass
-
-        # Current line consistent with and no deeper than previous winner:
-        # it's the new winner.
-        elif margin.startswith(indent):
-            margin = indent
-
-        # Find the largest common whitespace between current line and previous
-        # winner.
+        list lines
+        str line
+        str margin_line = None
+        Py_ssize_t count, i, j, k, n
+        Py_ssize_t margin = -1
+        bint changed = False
+        Py_UCS4 ch
+
+    if not text:
+        return text
+
+    # Scan every line once: blank out whitespace-only lines and narrow
+    # the common leading margin (spaces and tabs) of the remaining lines.
+    lines = text.split("\n")
+    count = len(lines)
+    for i in range(count):
+        line = lines[i]
+        n = len(line)
+        j = 0
+        while j < n:
+            ch = line[j]
+            if ch != " " and ch != "\t":
+                break
+            j += 1
+
+        # Whitespace-only line
+        if j == n:
+            if n:
+                lines[i] = ""
+                changed = True
+            continue
+
+        # First indented line sets the margin
+        if margin == -1:
+            margin_line = line
+            margin = j
+
+        # Largest common whitespace between current line and previous winner
         else:
-            for i, (x, y) in enumerate(zip(margin, indent)):
-                if x != y:
-                    margin = margin[:i]
-                    break
-
-    if margin != "$NONE$":
-        text = _re_sub(r"(?m)^" + margin, "", text)
-    return text
+            if j < margin:
+                margin = j
+            k = 0
+            while k < margin and margin_line[k] == line[k]:
+                k += 1
+            margin = k
+
+    # Slice the margin off every non-blank line in place.
+    if margin > 0:
+        for i in range(count):
+            line = lines[i]
+            if line:
+                lines[i] = line[margin:]
+        changed = True
+
+    if not changed:
+        return text
+    return "\n".join(lines)
+
+### Arrow string kernels
+# Each kernel reads the raw `offsets` & `data` buffers of an Arrow
+# `StringArray` (int32 offsets) or `LargeStringArray` (int64 offsets)
+# and writes the result into freshly allocated buffers of the same
+# layout, so no Python `str` is created for any of the rows.
+cdef int64_t _INT32_MAX = 2147483647
+cdef unsigned char _EMPTY[1]
+
+cdef inline const unsigned char* _buffer_ptr(const unsigned char[::1] view):
+    if view.shape[0] == 0:
+        return _EMPTY
+    return &view[0]
+
+cdef inline int64_t _get_offset(const unsigned char* offsets, Py_ssize_t i, bint large) nogil:
+    if large:
+        return (<const int64_t*> offsets)[i]
+    return (<const int32_t*> offsets)[i]
+
+cdef inline void _set_offset(unsigned char* offsets, Py_ssize_t i, int64_t val, bint large) nogil:
+    if large:
+        (<int64_t*> offsets)[i] = val
+    else:
+        (<int32_t*> offsets)[i] = <int32_t> val
+
+cdef inline bint _is_ascii_space(unsigned char c) nogil:
+    # Same ASCII set as `str.strip()`: \t\n\v\f\r, \x1c-\x1f and space
+    return c == 32 or (9 <= c <= 13) or (28 <= c <= 31)
+
+cdef inline bytearray _new_offsets(Py_ssize_t length, bint large):
+    return bytearray((length + 1) * (8 if large else 4))
+
+@cython.boundscheck(False)  # Deactivate bounds checking
+@cython.wraparound(False)   # Deactivate negative indexing
+cpdef tuple arrow_remove_double_spaces(object offsets, object data, Py_ssize_t start, Py_ssize_t length, bint large):
+    cdef:
+        const unsigned char* src_off = _buffer_ptr(offsets)
+        const unsigned char* src = _buffer_ptr(data)
+        int64_t first = _get_offset(src_off, start, large)
+        int64_t last = _get_offset(src_off, start + length, large)
+        bytearray res_offsets = _new_offsets(length, large)
+        bytearray res_data = bytearray(last - first)
+        unsigned char* dst_off = res_offsets
+        unsigned char* dst = res_data
+        int64_t pos = 0, s, e, j
+        Py_ssize_t i
+        unsigned char c
+
+    with nogil:
+        _set_offset(dst_off, 0, 0, large)
+        for i in range(length):
+            s = _get_offset(src_off, start + i, large)
+            e = _get_offset(src_off, start + i + 1, large)
+            # strip
+            while s < e and _is_ascii_space(src[s]):
+                s += 1
+            while e > s and _is_ascii_space(src[e - 1]):
+                e -= 1
+            # collapse runs of spaces
+            for j in range(s, e):
+                c = src[j]
+                if c == 32 and j > s and src[j - 1] == 32:
+                    continue
+                dst[pos] = c
+                pos += 1
+            _set_offset(dst_off, i + 1, pos, large)
+
+    del res_data[pos:]
+    return res_offsets, res_data, 0
+
+cdef inline int64_t _find(const unsigned char* src, int64_t s, int64_t e, const unsigned char* targ, Py_ssize_t targ_len) nogil:
+    cdef:
+        int64_t j
+        unsigned char head = targ[0]
+
+    j = s
+    while j + targ_len <= e:
+        if src[j] == head and memcmp(src + j, targ, targ_len) == 0:
+            return j
+        j += 1
+    return -1
+
+@cython.boundscheck(False)  # Deactivate bounds checking
+@cython.wraparound(False)   # Deactivate negative indexing
+cdef tuple _arrow_replace_pass(
+    object offsets, object data, Py_ssize_t start, Py_ssize_t length, bint large,
+    const unsigned char[::1] targ, const unsigned char[::1] repl,
+):
+    cdef:
+        const unsigned char* src_off = _buffer_ptr(offsets)
+        const unsigned char* src = _buffer_ptr(data)
+        const unsigned char* targ_ptr = _buffer_ptr(targ)
+        const unsigned char* repl_ptr = _buffer_ptr(repl)
+        Py_ssize_t targ_len = targ.shape[0]
+        Py_ssize_t repl_len = repl.shape[0]
+        int64_t first = _get_offset(src_off, start, large)
+        int64_t last = _get_offset(src_off, start + length, large)
+        int64_t hits = 0, pos = 0, size, s, e, j
+        bytearray res_offsets
+        bytearray res_data
+        unsigned char* dst_off
+        unsigned char* dst
+        Py_ssize_t i
+
+    # First pass: count the matches to size the output exactly
+    with nogil:
+        for i in range(length):
+            s = _get_offset(src_off, start + i, large)
+            e = _get_offset(src_off, start + i + 1, large)
+            j = _find(src, s, e, targ_ptr, targ_len)
+            while j != -1:
+                hits += 1
+                j = _find(src, j + targ_len, e, targ_ptr, targ_len)
+    if hits == 0:
+        return offsets, data, start, 0
+
+    size = last - first + hits * (repl_len - targ_len)
+    if not large and size > _INT32_MAX:
+        raise OverflowError("result exceeds the capacity of a StringArray, use LargeStringArray instead")
+    res_offsets = _new_offsets(length, large)
+    res_data = bytearray(size)
+    dst_off = res_offsets
+    dst = res_data
+
+    # Second pass: copy segments & replacements
+    with nogil:
+        _set_offset(dst_off, 0, 0, large)
+        for i in range(length):
+            s = _get_offset(src_off, start + i, large)
+            e = _get_offset(src_off, start + i + 1, large)
+            j = _find(src, s, e, targ_ptr, targ_len)
+            while j != -1:
+                memcpy(dst + pos, src + s, j - s)
+                pos += j - s
+                memcpy(dst + pos, repl_ptr, repl_len)
+                pos += repl_len
+                s = j + targ_len
+                j = _find(src, s, e, targ_ptr, targ_len)
+            memcpy(dst + pos, src + s, e - s)
+            pos += e - s
+            _set_offset(dst_off, i + 1, pos, large)
+
+    return res_offsets, res_data, 0, hits
+
+cpdef tuple arrow_replace_chars(
+    object offsets, object data, Py_ssize_t start, Py_ssize_t length, bint large,
+    str repl_char, tuple targ_chars, bint iterative,
+):
+    cdef:
+        bytes repl = repl_char.encode("utf-8")
+        bytes targ
+        str targ_char
+        int64_t hits
+
+    for targ_char in targ_chars:
+        if not targ_char:
+            raise ValueError("target chars cannot be empty")
+        targ = targ_char.encode("utf-8")
+        offsets, data, start, hits = _arrow_replace_pass(offsets, data, start, length, large, targ, repl)
+        while iterative and hits:
+            offsets, data, start, hits = _arrow_replace_pass(offsets, data, start, length, large, targ, repl)
+
+    return offsets, data, start
+
+@cython.boundscheck(False)  # Deactivate bounds checking
+@cython.wraparound(False)   # Deactivate negative indexing
+cpdef tuple arrow_extract_alphanumeric_underscore(object offsets, object data, Py_ssize_t start, Py_ssize_t length, bint large):
+    cdef:
+        const unsigned char* src_off = _buffer_ptr(offsets)
+        const unsigned char* src = _buffer_ptr(data)
+        int64_t first = _get_offset(src_off, start, large)
+        int64_t last = _get_offset(src_off, start + length, large)
+        bytearray res_offsets = _new_offsets(length, large)
+        bytearray res_data = bytearray(last - first)
+        unsigned char* dst_off = res_offsets
+        unsigned char* dst = res_data
+        int64_t pos = 0, j
+        Py_ssize_t i
+        unsigned char c
+
+    with nogil:
+        _set_offset(dst_off, 0, 0, large)
+        for i in range(length):
+            for j in range(_get_offset(src_off, start + i, large), _get_offset(src_off, start + i + 1, large)):
+                c = src[j]
+                if (c >= b'A' and c <= b'Z') or (c >= b'a' and c <= b'z') or (c >= b'0' and c <= b'9') or c == b'_':
+                    dst[pos] = c
+                    pos += 1
+            _set_offset(dst_off, i + 1, pos, large)
+
+    del res_data[pos:]
+    return res_offsets, res_data, 0
+
+@cython.boundscheck(False)  # Deactivate bounds checking
+@cython.wraparound(False)   # Deactivate negative indexing
+cpdef bytearray arrow_parse_float(
+    object offsets, object data, Py_ssize_t start, Py_ssize_t length, bint large,
+    object validity, bint signed,
+):
+    cdef:
+        const unsigned char* src_off = _buffer_ptr(offsets)
+        const unsigned char* src = _buffer_ptr(data)
+        const unsigned char* valid = NULL
+        const unsigned char[::1] valid_view
+        bytearray res = bytearray(length * 8)
+        double* values = <double*> (<unsigned char*> res)
+        int64_t s, e, j, width = 0
+        Py_ssize_t i, pos
+        bint neg, dot, digit
+        char* buf
+        unsigned char c
+
+    if validity is not None:
+        valid_view = validity
+        valid = _buffer_ptr(valid_view)
+    for i in range(length):
+        width = max(width, _get_offset(src_off, start + i + 1, large) - _get_offset(src_off, start + i, large))
+
+    buf = <char*> malloc(width + 2)
+    if buf == NULL:
+        raise MemoryError()
+    try:
+        for i in range(length):
+            values[i] = 0
+            if valid != NULL and not (valid[(start + i) >> 3] >> ((start + i) & 7)) & 1:
+                continue
+            s = _get_offset(src_off, start + i, large)
+            e = _get_offset(src_off, start + i + 1, large)
+            pos = 1
+            neg = dot = digit = False
+            for j in range(s, e):
+                c = src[j]
+                if c >= b'0' and c <= b'9':
+                    buf[pos] = c
+                    pos += 1
+                    digit = True
+                elif c == b'.' and digit and not dot:
+                    buf[pos] = c
+                    pos += 1
+                    dot = True
+                elif c == b'-':
+                    neg = True
+            if not digit:
+                raise ValueError("row %d doesn't contain any digits" % i)
+            buf[pos] = 0
+            if signed and neg:
+                buf[0] = b'-'
+                values[i] = PyOS_string_to_double(buf, NULL, None)
+            else:
+                values[i] = PyOS_string_to_double(buf + 1, NULL, None)
+    finally:
+        free(buf)
+
+    return res
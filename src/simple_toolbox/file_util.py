@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+import os
+import gzip as _gzip
+from time import sleep as _sleep, monotonic as _monotonic
+from secrets import token_hex as _token_hex
+from contextlib import contextmanager as _contextmanager, nullcontext as _nullcontext
+from typing import BinaryIO, Iterator, Literal
+
+try:
+    import fcntl as _fcntl
+except ImportError:
+    _fcntl = None
+    import msvcrt as _msvcrt
+
+try:
+    import zstandard as _zstd
+except ImportError:
+    _zstd = None
+
+try:
+    import lz4.frame as _lz4_frame
+except ImportError:
+    _lz4_frame = None
+
+__all__ = ["open_compressed", "detect_compression", "atomic_write", "file_lock"]
+
+
+# Compression --------------------------------------------------------------------------
+# name: (extension, magic bytes)
+_COMPRESSIONS: dict[str, tuple[str, bytes]] = {
+    "gzip": (".gz", b"\x1f\x8b"),
+    "zstd": (".zst", b"\x28\xb5\x2f\xfd"),
+    "lz4": (".lz4", b"\x04\x22\x4d\x18"),
+}
+
+
+def detect_compression(path: str, sniff: bool = True) -> str | None:
+    """Detect the compression of a file
+
+    :param path: path of the file
+    :param sniff: read the magic bytes of the file, otherwise only the
+        extension is checked ('.gz', '.zst', '.lz4')
+    :return: 'gzip', 'zstd', 'lz4' or None
+    """
+
+    if sniff:
+        try:
+            with open(path, "rb") as file:
+                head = file.read(4)
+        except FileNotFoundError:
+            pass
+        else:
+            for name, (_, magic) in _COMPRESSIONS.items():
+                if head.startswith(magic):
+                    return name
+            return None
+
+    for name, (ext, _) in _COMPRESSIONS.items():
+        if path.endswith(ext):
+            return name
+    return None
+
+
+def open_compressed(
+    path: str,
+    mode: Literal["rb", "wb", "ab"] = "rb",
+    compression: str | None = "infer",
+    level: int | None = None,
+) -> BinaryIO:
+    """Open a binary file, (de)compressing the stream on the fly
+
+    :param path: path of the file
+    :param mode: 'rb', 'wb' or 'ab'
+    :param compression: 'gzip', 'zstd', 'lz4', None, or 'infer' from the
+        magic bytes (reading) or the extension (writing)
+    :param level: compression level, defaults to 9 for gzip, 3 for zstd
+        and 0 for lz4
+    :return: binary file object
+    """
+
+    if compression == "infer":
+        compression = detect_compression(path, sniff=mode == "rb")
+
+    if compression is None:
+        return open(path, mode, buffering=1 << 20)
+    if compression == "gzip":
+        return _gzip.open(path, mode, compresslevel=9 if level is None else level)
+    if compression == "zstd":
+        if _zstd is None:
+            raise ImportError("zstd compression requires the `zstandard` package")
+        if mode == "rb":
+            return _zstd.open(path, mode)
+        cctx = _zstd.ZstdCompressor(level=3 if level is None else level)
+        return _zstd.open(path, mode, cctx=cctx)
+    if compression == "lz4":
+        if _lz4_frame is None:
+            raise ImportError("lz4 compression requires the `lz4` package")
+        return _lz4_frame.open(path, mode, compression_level=level or 0)
+    raise ValueError(
+        "Unsupported compression '%s', choose from: %s, 'infer' or None"
+        % (compression, ", ".join(map(repr, _COMPRESSIONS)))
+    )
+
+
+# Atomic Write -------------------------------------------------------------------------
+@_contextmanager
+def atomic_write(
+    path: str,
+    mode: Literal["wb"] = "wb",
+    *,
+    compression: str | None = None,
+    level: int | None = None,
+    fsync: bool = False,
+    lock: bool = False,
+) -> Iterator[BinaryIO]:
+    """Write a file atomically: readers see either the old or the new
+    content, never a partial file, even if the process crashes
+
+    Data is written to a temporary file in the same directory, which then
+    replaces `path` through `os.replace`. On error the temporary file is
+    removed and `path` is left untouched. A symlinked `path` is resolved
+    first, the file it points to is replaced and the link is kept.
+
+    :param path: path of the file
+    :param mode: only 'wb' (binary write)
+    :param compression: 'gzip', 'zstd', 'lz4', None, or 'infer' from the
+        extension of `path`, see `open_compressed`
+    :param level: compression level
+    :param fsync: flush the file and its directory entry to disk before
+        returning, so the new content also survives a power loss
+    :param lock: hold `file_lock(path)` while writing, so concurrent
+        writers of other processes take turns
+    :return: binary file object of the temporary file
+
+    :Example:
+    >>> with file_util.atomic_write("config.json", fsync=True) as file:
+            file.write(data)
+    """
+
+    if mode != "wb":
+        raise ValueError("<file_util.atomic_write> `mode` must be 'wb'")
+    if compression == "infer":
+        compression = detect_compression(path, sniff=False)
+
+    # replacing a symlink would turn it into a regular file
+    path = os.path.realpath(path)
+    directory, name = os.path.split(path)
+    temp = os.path.join(directory, ".%s.%s.tmp" % (name, _token_hex(4)))
+    with file_lock(path) if lock else _nullcontext():
+        # created by us alone, with the default (umask) permissions
+        os.close(os.open(temp, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+        try:
+            with open_compressed(temp, "wb", compression, level) as file:
+                yield file
+            if os.path.exists(path):
+                _copy_mode(path, temp)
+            if fsync:
+                _fsync(temp)
+            os.replace(temp, path)
+        except BaseException:
+            try:
+                os.remove(temp)
+            except FileNotFoundError:
+                pass
+            raise
+        if fsync:
+            _fsync_dir(directory)
+
+
+def _copy_mode(src: str, dst: str) -> None:
+    try:
+        os.chmod(dst, os.stat(src).st_mode & 0o7777)
+    except OSError:
+        pass
+
+
+def _fsync(path: str) -> None:
+    fd = os.open(path, os.O_RDWR)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(directory: str) -> None:
+    if os.name != "posix":
+        # directory entries can't be fsynced on Windows
+        return None
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# File Lock ----------------------------------------------------------------------------
+@_contextmanager
+def file_lock(path: str, timeout: float | None = None) -> Iterator[str]:
+    """Exclusive inter-process lock for `path`, held on '<path>.lock'
+
+    The lock file is kept after release, removing it would let two
+    processes lock different files of the same name.
+
+    :param path: path of the guarded file
+    :param timeout: seconds to wait for the lock, `None` waits forever
+    :raises TimeoutError: if the lock is not acquired within `timeout`
+    :return: path of the lock file
+    """
+
+    lock_path = path + ".lock"
+    fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o666)
+    try:
+        _acquire(fd, lock_path, timeout)
+        try:
+            yield lock_path
+        finally:
+            _release(fd)
+    finally:
+        os.close(fd)
+
+
+def _acquire(fd: int, lock_path: str, timeout: float | None) -> None:
+    if _fcntl is not None and timeout is None:
+        _fcntl.flock(fd, _fcntl.LOCK_EX)
+        return None
+
+    deadline = None if timeout is None else _monotonic() + timeout
+    while True:
+        try:
+            if _fcntl is not None:
+                _fcntl.flock(fd, _fcntl.LOCK_EX | _fcntl.LOCK_NB)
+            else:
+                _msvcrt.locking(fd, _msvcrt.LK_NBLCK, 1)
+            return None
+        except OSError:
+            if deadline is not None and _monotonic() >= deadline:
+                raise TimeoutError(
+                    "<file_util.file_lock> Timed out waiting for lock: '%s'" % lock_path
+                )
+            _sleep(0.01)
+
+
+def _release(fd: int) -> None:
+    if _fcntl is not None:
+        _fcntl.flock(fd, _fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        _msvcrt.locking(fd, _msvcrt.LK_UNLCK, 1)
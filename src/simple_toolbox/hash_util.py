@@ -1,9 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
-from hashlib import md5 as _hashlib_md5
+from hashlib import md5 as _hashlib_md5, new as _hashlib_new
 from random import getrandbits as _getrandbits
 
-__all__ = ["md5", "ramdon"]
+__all__ = ["md5", "ramdon", "file_digest"]
 
 
 def md5(obj: object) -> str:
@@ -31,3 +31,25 @@ def random(bits: int = 128) -> str:
     :return: Random Hash <'str'>
     """
     return "%032x" % _getrandbits(bits)
+
+
+def file_digest(path: str, algorithm: str = "md5", chunk_size: int = 1 << 20) -> str:
+    """Hash the content of a file, reading it in chunks
+
+    :param path: Path of the file <'str'>
+    :param algorithm: Name of the `hashlib` algorithm, e.g. "md5", "sha256" <'str'>
+    :param chunk_size: Bytes read per chunk <'int'>
+    :return: Hex digest of the file content <'str'>
+    """
+
+    try:
+        digest = _hashlib_new(algorithm)
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        with open(path, "rb", buffering=0) as file:
+            while size := file.readinto(buffer):
+                digest.update(view[:size])
+        return digest.hexdigest()
+    except Exception as err:
+        err.add_note(f"<hash_util.file_digest> Unable to hash file: '{path}'")
+        raise
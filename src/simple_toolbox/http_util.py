@@ -1,13 +1,701 @@
 # /usr/bin/python
 # -*- coding: UTF-8 -*-
 import asyncio
+import os as _os
 from io import BytesIO as _BytesIO
+from time import monotonic as _monotonic, time as _time
+from json import loads as _json_loads, dumps as _json_dumps
+from hashlib import md5 as _md5
+from collections import OrderedDict as _OrderedDict
+from random import uniform as _uniform
+from email.utils import parsedate_to_datetime as _parsedate_to_datetime
+from datetime import datetime as _datetime, timezone as _timezone
+from functools import partial as _partial
+from concurrent.futures import Executor as _Executor
+from contextlib import nullcontext as _nullcontext
+from urllib.parse import urlsplit as _urlsplit
+from weakref import WeakKeyDictionary as _WeakKeyDictionary
+from typing import AsyncIterator, Callable, Iterable
 
 from PIL.Image import open as _open_image
 from selectolax.parser import HTMLParser as _HTMLParser
 from aiohttp import ClientSession as _ClientSession, ClientResponse as _ClientResponse
+from aiohttp import TCPConnector as _TCPConnector, ClientTimeout as _ClientTimeout
+from aiohttp import ClientResponseError as _ClientResponseError
+from aiohttp import ClientConnectionError as _ClientConnectionError
+from aiohttp import ClientPayloadError as _ClientPayloadError
+from aiohttp import DummyCookieJar as _DummyCookieJar
+from simple_toolbox.rest_util import ProgressBar as _ProgressBar
+from simple_toolbox.hash_util import file_digest as _file_digest
+from simple_toolbox.file_util import atomic_write as _atomic_write
 
-__all__ = ["request_source", "request_json", "download_image", "parse"]
+__all__ = [
+    "HttpClient",
+    "default_client",
+    "close_default_client",
+    "RetryPolicy",
+    "CircuitOpenError",
+    "ResponseCache",
+    "request_source",
+    "request_json",
+    "download_image",
+    "download_file",
+    "extract",
+    "fetch_many",
+    "parse",
+]
+
+
+# Http Client
+class HttpClient:
+    """A long-lived `aiohttp.ClientSession` with a pooled `TCPConnector`
+
+    Connections (TCP/TLS, keep-alive) and DNS lookups are reused by all
+    requests made through the same client. A session is created lazily
+    on first use in each event loop, and closed when that loop shuts down
+    (`loop.shutdown_asyncgens()`, called by `asyncio.run()`) or by `close()`.
+
+    :Example:
+    >>> async with HttpClient(limit_per_host=10) as client:
+            html = await request_source(url, client=client)
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        ttl_dns_cache: int = 300,
+        keepalive_timeout: float = 15,
+        timeout: float = None,
+        headers: dict = None,
+        cookies: dict = None,
+        cookie_jar: bool = True,
+    ) -> None:
+        """
+        :param limit: total number of simultaneous connections, `0` for no limit
+        :param limit_per_host: number of simultaneous connections to the same
+            endpoint, `0` for no limit
+        :param ttl_dns_cache: seconds to cache DNS lookups, `None` for forever
+        :param keepalive_timeout: seconds to keep idle connections alive
+        :param timeout: default total timeout for each request, `None` for no limit
+        :param headers: default headers sent with every request
+        :param cookies: default cookies sent with every request
+        :param cookie_jar: keep cookies set by responses and send them with
+            later requests, `False` only sends the cookies passed explicitly
+        """
+
+        # params
+        self.__limit: int = limit
+        self.__limit_per_host: int = limit_per_host
+        self.__ttl_dns_cache: int = ttl_dns_cache
+        self.__keepalive_timeout: float = keepalive_timeout
+        self.__timeout: float = timeout
+        self.__headers: dict = headers
+        self.__cookies: dict = cookies
+        self.__cookie_jar: bool = cookie_jar
+        # handles: event loop -> (session, closer)
+        self.__sessions: _WeakKeyDictionary = _WeakKeyDictionary()
+
+    @property
+    def session(self) -> _ClientSession:
+        """The `aiohttp.ClientSession` of the running event loop (must be
+        accessed inside a running event loop)"""
+
+        loop = asyncio.get_running_loop()
+        handle = self.__sessions.get(loop)
+        if handle is None or handle[0].closed:
+            session = _ClientSession(
+                connector=_TCPConnector(
+                    limit=self.__limit,
+                    limit_per_host=self.__limit_per_host,
+                    ttl_dns_cache=self.__ttl_dns_cache,
+                    keepalive_timeout=self.__keepalive_timeout,
+                ),
+                timeout=_ClientTimeout(total=self.__timeout),
+                headers=self.__headers,
+                cookies=self.__cookies,
+                cookie_jar=None if self.__cookie_jar else _DummyCookieJar(),
+            )
+            handle = self.__sessions[loop] = (session, _close_on_shutdown(session))
+        return handle[0]
+
+    @property
+    def closed(self) -> bool:
+        return all(session.closed for session, _ in self.__sessions.values())
+
+    async def close(self) -> None:
+        """Close the session (and all pooled connections) of the running
+        event loop, sessions of other loops are closed when they shut down"""
+
+        handle = self.__sessions.pop(asyncio.get_running_loop(), None)
+        if handle is not None:
+            await handle[1].aclose()
+
+    async def __aenter__(self) -> "HttpClient":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    def __repr__(self) -> str:
+        return "<HttpClient (limit=%s, limit_per_host=%s, closed=%s)>" % (
+            self.__limit,
+            self.__limit_per_host,
+            self.closed,
+        )
+
+
+def _close_on_shutdown(session: _ClientSession) -> AsyncIterator[None]:
+    """Return a started async generator closing `session` when it is closed,
+    which the running event loop does on `shutdown_asyncgens()`"""
+
+    async def closer() -> AsyncIterator[None]:
+        try:
+            yield None
+        finally:
+            if not session.closed:
+                await session.close()
+
+    # first iteration registers the generator with the loop, and
+    # suspends it at `yield` without awaiting anything
+    agen = closer()
+    try:
+        agen.__anext__().send(None)
+    except StopIteration:
+        pass
+    return agen
+
+
+_DEFAULT_CLIENT: HttpClient = None
+
+
+def default_client() -> HttpClient:
+    """Return the module-level `HttpClient` shared by all functions
+    called without an explicit `client`
+
+    Cookies set by responses are not kept, so unrelated calls don't
+    share them. Its session is closed when the event loop shuts down.
+    """
+
+    global _DEFAULT_CLIENT
+    if _DEFAULT_CLIENT is None:
+        _DEFAULT_CLIENT = HttpClient(cookie_jar=False)
+    return _DEFAULT_CLIENT
+
+
+async def close_default_client() -> None:
+    """Close the module-level `HttpClient` of the running event loop,
+    for loops not shut down by `asyncio.run()`"""
+
+    if _DEFAULT_CLIENT is not None:
+        await _DEFAULT_CLIENT.close()
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised when requests to a host are suspended by the circuit breaker
+    of a `RetryPolicy`"""
+
+
+class RetryPolicy:
+    """Retry policy shared by the `http_util` request functions
+
+    - Only connection errors, timeouts, payload errors and retryable
+      statuses (`429`, `5xx` gateway errors) are retried, any other
+      failure is raised immediately.
+    - Waits in between attempts follow exponential backoff with
+      decorrelated jitter: `uniform(base, previous_wait * 3)`, capped.
+    - `Retry-After` response headers are honored.
+    - With `breaker_threshold`, a host is suspended for `breaker_cooldown`
+      seconds after that many consecutive retryable failures, requests
+      raise `CircuitOpenError` in the meantime. After the cooldown a single
+      trial request is let through (others keep raising), and its outcome
+      closes or re-opens the circuit. A trial that reports no outcome
+      within another cooldown is replaced by a new one.
+
+    :Example:
+    >>> policy = RetryPolicy(base=0.5, cap=30, breaker_threshold=5)
+    >>> await request_json(url, retry=5, policy=policy)
+    """
+
+    def __init__(
+        self,
+        *,
+        base: float = 0.2,
+        cap: float = 10,
+        statuses: tuple[int] = (429, 500, 502, 503, 504),
+        exceptions: tuple[type[Exception]] = (
+            _ClientConnectionError,
+            _ClientPayloadError,
+            asyncio.TimeoutError,
+        ),
+        retry_after: bool = True,
+        max_retry_after: float = 60,
+        breaker_threshold: int = None,
+        breaker_cooldown: float = 30,
+    ) -> None:
+        """
+        :param base: minimum wait in seconds between attempts
+        :param cap: maximum wait in seconds between attempts (backoff only)
+        :param statuses: response statuses to be retried
+        :param exceptions: exception types to be retried
+        :param retry_after: whether to honor `Retry-After` response headers
+        :param max_retry_after: maximum wait in seconds from `Retry-After`
+        :param breaker_threshold: consecutive failures that open the circuit
+            of a host, `None` to disable the circuit breaker
+        :param breaker_cooldown: seconds a host is suspended once opened
+        """
+
+        # params
+        self.__base: float = base
+        self.__cap: float = cap
+        self.__statuses: frozenset[int] = frozenset(statuses)
+        self.__exceptions: tuple[type[Exception]] = tuple(exceptions)
+        self.__retry_after: bool = retry_after
+        self.__max_retry_after: float = max_retry_after
+        self.__breaker_threshold: int = breaker_threshold
+        self.__breaker_cooldown: float = breaker_cooldown
+        # circuit breaker: host -> [consecutive failures, open until, trial until]
+        self.__circuits: dict[str, list] = {}
+
+    def is_retryable_status(self, status: int) -> bool:
+        return status in self.__statuses
+
+    def is_retryable(self, exc: Exception) -> bool:
+        if isinstance(exc, _ClientResponseError):
+            return exc.status in self.__statuses
+        return isinstance(exc, self.__exceptions)
+
+    def backoff(self, previous: float) -> float:
+        """Wait before the next attempt, given the `previous` wait"""
+
+        return min(self.__cap, _uniform(self.__base, max(previous, self.__base) * 3))
+
+    def retry_after(self, headers: dict) -> float | None:
+        """Seconds to wait from the `Retry-After` header (if any)"""
+
+        if not self.__retry_after or not (value := headers.get("Retry-After")):
+            return None
+        try:
+            wait = float(value)
+        except ValueError:
+            try:
+                date = _parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            wait = (date - _datetime.now(_timezone.utc)).total_seconds()
+        return min(max(wait, 0), self.__max_retry_after)
+
+    def check(self, host: str) -> None:
+        """Raise `CircuitOpenError` if requests to `host` are suspended"""
+
+        if self.__breaker_threshold is None:
+            return None
+        circuit = self.__circuits.get(host)
+        if circuit is None or not (circuit[1] or circuit[2]):
+            return None
+        if (now := _monotonic()) < circuit[1]:
+            raise CircuitOpenError(
+                "<http_util.RetryPolicy> Circuit open for host '%s', retry in %.1fs"
+                % (host, circuit[1] - now)
+            )
+        if now < circuit[2]:
+            raise CircuitOpenError(
+                "<http_util.RetryPolicy> Circuit half-open for host '%s', "
+                "waiting for the trial request" % host
+            )
+        # Half-open: let one trial through, re-open if it fails
+        circuit[0] = self.__breaker_threshold - 1
+        circuit[1] = 0
+        circuit[2] = now + self.__breaker_cooldown
+
+    def record_success(self, host: str) -> None:
+        if self.__breaker_threshold is not None:
+            self.__circuits.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        if self.__breaker_threshold is None:
+            return None
+        if (circuit := self.__circuits.get(host)) is None:
+            circuit = self.__circuits[host] = [0, 0, 0]
+        circuit[0] += 1
+        if circuit[0] >= self.__breaker_threshold:
+            circuit[1] = _monotonic() + self.__breaker_cooldown
+            circuit[2] = 0
+
+    def __repr__(self) -> str:
+        return "<RetryPolicy (base=%s, cap=%s, statuses=%s, breaker_threshold=%s)>" % (
+            self.__base,
+            self.__cap,
+            sorted(self.__statuses),
+            self.__breaker_threshold,
+        )
+
+
+_DEFAULT_POLICY: RetryPolicy = RetryPolicy()
+
+
+# Cache
+class _CacheEntry:
+    __slots__ = ("body", "etag", "last_modified", "expires")
+
+    def __init__(
+        self,
+        body: bytes,
+        etag: str | None,
+        last_modified: str | None,
+        expires: float,
+    ) -> None:
+        self.body: bytes = body
+        self.etag: str | None = etag
+        self.last_modified: str | None = last_modified
+        self.expires: float = expires
+
+    @property
+    def fresh(self) -> bool:
+        return _time() < self.expires
+
+
+class ResponseCache:
+    """LRU cache of response bodies for `request_source` / `request_json`
+
+    - Fresh responses (`Cache-Control: max-age`) are served without any
+      network call, stale ones are revalidated with `If-None-Match` /
+      `If-Modified-Since` and served from the cache on `304`.
+    - Identical requests in flight at the same time share one network call.
+    - Only `200` responses with a `max-age` or a validator (`ETag`,
+      `Last-Modified`) are cached, `no-store` is honored. Entries are keyed
+      by url & params, request headers & cookies are not part of the key.
+
+    :Example:
+    >>> cache = ResponseCache(max_bytes=256 * 1024 * 1024)
+    >>> await request_json(url, cache=cache)
+    """
+
+    def __init__(self, *, max_bytes: int = 67_108_864, path: str = None) -> None:
+        """
+        :param max_bytes: maximum total size of the cached bodies, least
+            recently used entries are evicted first
+        :param path: directory to store the entries in, `None` to keep
+            them in memory. Each entry is a file of one JSON line (the
+            validators & expiry) followed by the raw body, nothing in it
+            is executed when read back
+        """
+
+        # params
+        self.__max_bytes: int = max_bytes
+        self.__path: str = path
+        # track: name -> entry (memory) or body size (disk)
+        self.__entries: _OrderedDict[str, _CacheEntry | int] = _OrderedDict()
+        self.__size: int = 0
+        self.__inflight: dict[str, asyncio.Future] = {}
+        if path is not None:
+            self.__load_index()
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached bodies in bytes"""
+
+        return self.__size
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key: str) -> _CacheEntry | None:
+        name = self.__name(key)
+        if name not in self.__entries:
+            return None
+        self.__entries.move_to_end(name)
+        if self.__path is None:
+            return self.__entries[name]
+        try:
+            with open(self.__file(name), "rb") as file:
+                meta = _json_loads(file.readline())
+                body = file.read()
+            return _CacheEntry(
+                body, meta["etag"], meta["last_modified"], meta["expires"]
+            )
+        except Exception:
+            self.__discard(name)
+            return None
+
+    def put(self, key: str, entry: _CacheEntry) -> None:
+        if len(entry.body) > self.__max_bytes:
+            return None
+        name = self.__name(key)
+        self.__discard(name)
+        if self.__path is None:
+            self.__entries[name] = entry
+        else:
+            meta = {
+                "etag": entry.etag,
+                "last_modified": entry.last_modified,
+                "expires": entry.expires,
+            }
+            with _atomic_write(self.__file(name)) as file:
+                # ASCII json holds no raw newline
+                file.write(_json_dumps(meta).encode("ascii") + b"\n")
+                file.write(entry.body)
+            self.__entries[name] = len(entry.body)
+        self.__size += len(entry.body)
+        while self.__size > self.__max_bytes:
+            self.__discard(next(iter(self.__entries)))
+
+    def clear(self) -> None:
+        for name in list(self.__entries):
+            self.__discard(name)
+
+    async def coalesce(self, key: str, fetch: Callable) -> bytes:
+        """Run `fetch()` once for all concurrent callers with the same `key`"""
+
+        if (fut := self.__inflight.get(key)) is not None:
+            return await asyncio.shield(fut)
+
+        fut = self.__inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            body = await fetch()
+        except BaseException as err:
+            fut.set_exception(err)
+            fut.exception()  # mark retrieved
+            raise
+        else:
+            fut.set_result(body)
+            return body
+        finally:
+            self.__inflight.pop(key, None)
+
+    def __name(self, key: str) -> str:
+        return _md5(key.encode("utf-8")).hexdigest()
+
+    def __file(self, name: str) -> str:
+        return _os.path.join(self.__path, name + ".cache")
+
+    def __discard(self, name: str) -> None:
+        if (item := self.__entries.pop(name, None)) is None:
+            return None
+        if self.__path is None:
+            self.__size -= len(item.body)
+        else:
+            self.__size -= item
+            try:
+                _os.remove(self.__file(name))
+            except FileNotFoundError:
+                pass
+
+    def __load_index(self) -> None:
+        _os.makedirs(self.__path, exist_ok=True)
+        files = []
+        with _os.scandir(self.__path) as it:
+            for entry in it:
+                if entry.name.endswith(".cache") and entry.is_file():
+                    files.append((entry.stat().st_mtime, entry.name[:-6]))
+        for _, name in sorted(files):
+            # approximate body size by the file size
+            size = _os.path.getsize(self.__file(name))
+            self.__entries[name] = size
+            self.__size += size
+        while self.__size > self.__max_bytes:
+            self.__discard(next(iter(self.__entries)))
+
+    def __repr__(self) -> str:
+        return "<ResponseCache (entries=%s, size=%s, max_bytes=%s, path=%s)>" % (
+            len(self.__entries),
+            self.__size,
+            self.__max_bytes,
+            self.__path,
+        )
+
+
+def _cache_expires(headers: dict) -> float | None:
+    """Expiry timestamp from `Cache-Control`, `None` if not cacheable"""
+
+    max_age, no_cache = 0, False
+    for directive in headers.get("Cache-Control", "").lower().split(","):
+        directive = directive.strip()
+        if directive == "no-store":
+            return None
+        # keep reading, a later directive may still be `no-store`
+        if directive == "no-cache":
+            no_cache = True
+        elif directive.startswith("max-age="):
+            try:
+                max_age = max(int(directive[8:]), 0)
+            except ValueError:
+                pass
+    return _time() + (0 if no_cache else max_age)
+
+
+async def _request_cached(
+    url: str,
+    cache: ResponseCache,
+    client: HttpClient | None,
+    policy: RetryPolicy | None,
+    retry: int,
+    kwargs: dict,
+) -> bytes:
+    """GET the body of `url` through `cache`"""
+
+    key = repr((url, sorted(kwargs["params"].items()) if kwargs["params"] else None))
+    entry = cache.get(key)
+    if entry is not None and entry.fresh:
+        return entry.body
+
+    async def fetch() -> bytes:
+        req_kwargs = kwargs
+        if entry is not None:
+            validators = {}
+            if entry.etag:
+                validators["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                validators["If-Modified-Since"] = entry.last_modified
+            req_kwargs = {
+                **kwargs,
+                "headers": {**(kwargs["headers"] or {}), **validators},
+            }
+
+        async def read(res: _ClientResponse) -> tuple:
+            return res.status, res.headers.copy(), await res.read()
+
+        status, headers, body = await _request(
+            url, read, client, policy, retry, req_kwargs
+        )
+        expires = _cache_expires(headers)
+        if status == 304 and entry is not None:
+            if expires is not None:
+                entry.expires = expires
+                cache.put(key, entry)
+            return entry.body
+        if status == 200 and expires is not None:
+            etag, modified = headers.get("ETag"), headers.get("Last-Modified")
+            if etag or modified or expires > _time():
+                cache.put(key, _CacheEntry(body, etag, modified, expires))
+        return body
+
+    return await cache.coalesce(key, fetch)
+
+
+# Request
+def _request_kwargs(
+    cookies: dict,
+    headers: dict,
+    params: dict,
+    data: dict,
+    proxy: str,
+    timeout: int,
+) -> dict:
+    """Keyword arguments for `ClientSession.get()`, the client's default
+    timeout applies when `timeout` is not provided"""
+
+    kwargs = {
+        "cookies": cookies,
+        "headers": headers,
+        "params": params,
+        "data": data,
+        "proxy": proxy,
+    }
+    if timeout is not None:
+        kwargs["timeout"] = _ClientTimeout(total=timeout)
+    return kwargs
+
+
+async def _request(
+    url: str,
+    read: callable,
+    client: HttpClient | None,
+    policy: RetryPolicy | None,
+    retry: int,
+    kwargs: dict | Callable[[], dict],
+) -> object:
+    """GET `url` and `read` the response, retrying according to `policy`
+
+    `kwargs` can be a function returning the request keyword arguments,
+    called before each attempt.
+    """
+
+    session = (client or default_client()).session
+    policy = policy or _DEFAULT_POLICY
+    host = _urlsplit(url).netloc
+    wait: float = 0
+    retry = max(retry, 1)
+    for attempt in range(1, retry + 1):
+        policy.check(host)
+        retry_after = None
+        try:
+            async with session.get(
+                url, **(kwargs() if callable(kwargs) else kwargs)
+            ) as res:
+                if policy.is_retryable_status(res.status):
+                    retry_after = policy.retry_after(res.headers)
+                    raise _ClientResponseError(
+                        res.request_info,
+                        res.history,
+                        status=res.status,
+                        message=res.reason,
+                        headers=res.headers,
+                    )
+                result = await read(res)
+
+        except Exception as err:
+            if not policy.is_retryable(err):
+                raise
+            policy.record_failure(host)
+            if attempt >= retry:
+                raise
+            wait = policy.backoff(wait)
+            await asyncio.sleep(wait if retry_after is None else max(wait, retry_after))
+
+        else:
+            policy.record_success(host)
+            return result
+
+
+async def _read_source(res: _ClientResponse) -> _HTMLParser:
+    return _HTMLParser(await res.read())
+
+
+async def _read_json(res: _ClientResponse) -> dict:
+    return await res.json()
+
+
+def _convert_image(data: bytes, format: str) -> bytes:
+    img = _open_image(_BytesIO(data))
+    img_byte_arr = _BytesIO()
+    img.save(img_byte_arr, format=format)
+    return img_byte_arr.getvalue()
+
+
+def _save_image(data: bytes, format: str, path: str) -> str:
+    data = _convert_image(data, format)
+    with _atomic_write(path) as file:
+        file.write(data)
+    return path
+
+
+async def _read_image(
+    res: _ClientResponse,
+    path: str | None,
+    convert: str | None,
+    chunk_size: int,
+) -> bytes | str:
+    # Convert (and save) in a thread, decoding, encoding & writing the
+    # whole image would block the event loop
+    if convert is not None:
+        data, loop = await res.read(), asyncio.get_running_loop()
+        if path is None:
+            return await loop.run_in_executor(None, _convert_image, data, convert)
+        return await loop.run_in_executor(None, _save_image, data, convert, path)
+
+    # Raw bytes, a failed attempt leaves `path` untouched
+    if path is None:
+        return await res.read()
+    with _atomic_write(path) as file:
+        async for chunk in res.content.iter_chunked(chunk_size):
+            file.write(chunk)
+    return path
+
+
+async def _read_bytes(res: _ClientResponse) -> bytes:
+    return await res.read()
 
 
 async def request_source(
@@ -20,6 +708,10 @@ async def request_source(
     proxy: str = None,
     timeout: int = None,
     retry: int = 1,
+    client: HttpClient = None,
+    policy: RetryPolicy = None,
+    offload: bool = False,
+    cache: ResponseCache = None,
 ) -> _HTMLParser:
     """Request source code from a url
 
@@ -30,33 +722,35 @@ async def request_source(
     :param data: data to be sent with request
     :param proxy: proxy to be used for request
     :param timeout: timeout for request
-    :param retry: number of retries when failed
+    :param retry: number of attempts, failures are retried according to `policy`
+        (a retryable status, e.g. 503, on the last attempt raises
+        `aiohttp.ClientResponseError`, other statuses, e.g. 404, are read
+        like any response)
+    :param client: `HttpClient` to send the request with, default to `default_client()`
+    :param policy: `RetryPolicy` deciding which failures to retry and how long
+        to wait in between, default to `RetryPolicy()`
+    :param offload: whether to parse the source code in the default executor
+        of the event loop, so large pages don't block other requests
+    :param cache: `ResponseCache` to serve & store the response, `None` to disable
     :return: source code of url <class 'selectolax.parser.HTMLParser'>
     """
 
-    async with _ClientSession() as session:
-        exception: Exception = None
-        for _ in range(retry):
-            try:
-                async with session.get(
-                    url,
-                    cookies=cookies,
-                    headers=headers,
-                    params=params,
-                    data=data,
-                    proxy=proxy,
-                    timeout=timeout,
-                ) as res:
-                    return _HTMLParser(await res.read())
-
-            except Exception as err:
-                exception = err
-                await asyncio.sleep(0.2)
-
-        exception.add_note(
+    try:
+        kwargs = _request_kwargs(cookies, headers, params, data, proxy, timeout)
+        if cache is not None:
+            body = await _request_cached(url, cache, client, policy, retry, kwargs)
+            if not offload:
+                return _HTMLParser(body)
+        elif not offload:
+            return await _request(url, _read_source, client, policy, retry, kwargs)
+        else:
+            body = await _request(url, _read_bytes, client, policy, retry, kwargs)
+        return await asyncio.get_running_loop().run_in_executor(None, _HTMLParser, body)
+    except Exception as err:
+        err.add_note(
             f"<http_util.request_source> Failed to request source code from: '{url}'"
         )
-        raise exception
+        raise
 
 
 async def request_json(
@@ -69,6 +763,9 @@ async def request_json(
     proxy: str = None,
     timeout: int = None,
     retry: int = 1,
+    client: HttpClient = None,
+    policy: RetryPolicy = None,
+    cache: ResponseCache = None,
 ) -> dict:
     """Request json from a url
 
@@ -79,33 +776,27 @@ async def request_json(
     :param data: data to be sent with request
     :param proxy: proxy to be used for request
     :param timeout: timeout for request
-    :param retry: number of retries when failed
+    :param retry: number of attempts, failures are retried according to `policy`
+        (a retryable status, e.g. 503, on the last attempt raises
+        `aiohttp.ClientResponseError`, other statuses, e.g. 404, are read
+        like any response)
+    :param client: `HttpClient` to send the request with, default to `default_client()`
+    :param policy: `RetryPolicy` deciding which failures to retry and how long
+        to wait in between, default to `RetryPolicy()`
+    :param cache: `ResponseCache` to serve & store the response, `None` to disable
     :return: json of url <class 'dict'>
     """
 
-    async with _ClientSession() as session:
-        exception: Exception = None
-        for _ in range(retry):
-            try:
-                async with session.get(
-                    url,
-                    cookies=cookies,
-                    headers=headers,
-                    params=params,
-                    data=data,
-                    proxy=proxy,
-                    timeout=timeout,
-                ) as res:
-                    return await res.json()
-
-            except Exception as err:
-                exception = err
-                await asyncio.sleep(0.2)
-
-        exception.add_note(
-            f"<http_util.request_json> Failed to request json from: '{url}'"
-        )
-        raise exception
+    try:
+        kwargs = _request_kwargs(cookies, headers, params, data, proxy, timeout)
+        if cache is not None:
+            return _json_loads(
+                await _request_cached(url, cache, client, policy, retry, kwargs)
+            )
+        return await _request(url, _read_json, client, policy, retry, kwargs)
+    except Exception as err:
+        err.add_note(f"<http_util.request_json> Failed to request json from: '{url}'")
+        raise
 
 
 async def download_image(
@@ -118,9 +809,16 @@ async def download_image(
     proxy: str = None,
     timeout: int = None,
     retry: int = 1,
-) -> bytes:
+    client: HttpClient = None,
+    policy: RetryPolicy = None,
+    path: str = None,
+    convert: str = None,
+    chunk_size: int = 65_536,
+) -> bytes | str:
     """Download image from url
 
+    The image is returned (or saved) as is, unless `convert` is provided.
+
     :param src: url to be requested
     :param cookies: cookies to be sent with request
     :param headers: headers to be sent with request
@@ -128,35 +826,415 @@ async def download_image(
     :param data: data to be sent with request
     :param proxy: proxy to be used for request
     :param timeout: timeout for request
-    :param retry: number of retries when failed
-    :return: image <class 'bytes'>
+    :param retry: number of attempts, failures are retried according to `policy`
+        (a retryable status, e.g. 503, on the last attempt raises
+        `aiohttp.ClientResponseError`, other statuses, e.g. 404, are read
+        like any response)
+    :param client: `HttpClient` to send the request with, default to `default_client()`
+    :param policy: `RetryPolicy` deciding which failures to retry and how long
+        to wait in between, default to `RetryPolicy()`
+    :param path: file to save the image to, streamed in chunks when not
+        converted, and written atomically (see `file_util.atomic_write`).
+        If `None`, the image is returned as bytes.
+    :param convert: `PIL` format to convert the image to (e.g. `"PNG"`),
+        the conversion runs in the default executor of the event loop.
+        If `None`, no conversion.
+    :param chunk_size: bytes per chunk when streaming to `path`
+    :return: image <class 'bytes'>, or `path` <class 'str'> if provided
     """
 
-    async with _ClientSession() as session:
-        exception: Exception = None
-        for _ in range(retry):
-            try:
-                async with session.get(
-                    src,
-                    cookies=cookies,
-                    headers=headers,
-                    params=params,
-                    data=data,
-                    proxy=proxy,
-                    timeout=timeout,
-                ) as res:
-                    img = _open_image(_BytesIO(await res.read()))
-                    img_byte_arr = _BytesIO()
-                    img.save(img_byte_arr, format="PNG")
-                    return img_byte_arr.getvalue()
-            except Exception as err:
-                exception = err
-                await asyncio.sleep(0.2)
-
-        exception.add_note(
+    try:
+        return await _request(
+            src,
+            _partial(_read_image, path=path, convert=convert, chunk_size=chunk_size),
+            client,
+            policy,
+            retry,
+            _request_kwargs(cookies, headers, params, data, proxy, timeout),
+        )
+    except Exception as err:
+        err.add_note(
             f"<http_util.download_image> Failed to download image from: '{src}'"
         )
-        raise exception
+        raise
+
+
+def _part_size(part: str) -> int:
+    try:
+        return _os.path.getsize(part)
+    except OSError:
+        return 0
+
+
+def _content_range(res: _ClientResponse) -> tuple[int | None, int | None, int | None]:
+    """Parse `Content-Range: bytes start-end/total` into `(start, end, total)`"""
+
+    try:
+        _, spec = res.headers["Content-Range"].split(" ", 1)
+        span, total = spec.split("/", 1)
+        total = None if total == "*" else int(total)
+        if span == "*":
+            return None, None, total
+        start, end = span.split("-", 1)
+        return int(start), int(end), total
+    except (KeyError, ValueError):
+        raise _ClientPayloadError("invalid Content-Range response header")
+
+
+async def download_file(
+    url: str,
+    path: str,
+    *,
+    chunk_size: int = 1_048_576,
+    resume: bool = True,
+    checksum: str = None,
+    algorithm: str = "md5",
+    cookies: dict = None,
+    headers: dict = None,
+    params: dict = None,
+    proxy: str = None,
+    timeout: int = None,
+    retry: int = 1,
+    client: HttpClient = None,
+    policy: RetryPolicy = None,
+) -> str:
+    """Download a file from url, streamed to disk in chunks
+
+    The response is written to `path + ".part"`, which is renamed to
+    `path` once the size (and `checksum`) is verified. A `.part` file
+    left by an interrupted download (or a failed attempt) is resumed
+    with a HTTP `Range` request, if the server supports it. The file is
+    requested with `Accept-Encoding: identity`, so the bytes on disk are
+    the ones the server's `Content-Length` and ranges refer to.
+
+    :param url: url to be requested
+    :param path: file to save the download to
+    :param chunk_size: bytes per chunk written to disk
+    :param resume: whether to resume from an existing `.part` file
+    :param checksum: expected hex digest of the file content, `None` to skip
+    :param algorithm: `hashlib` algorithm of `checksum`
+    :param cookies: cookies to be sent with request
+    :param headers: headers to be sent with request
+    :param params: params to be sent with request
+    :param proxy: proxy to be used for request
+    :param timeout: timeout for request
+    :param retry: number of attempts, failures are retried according to `policy`
+    :param client: `HttpClient` to send the request with, default to `default_client()`
+    :param policy: `RetryPolicy` deciding which failures to retry and how long
+        to wait in between, default to `RetryPolicy()`
+    :return: `path` <class 'str'>
+    """
+
+    part = path + ".part"
+
+    # sizes & ranges refer to the raw bytes, which must not be encoded
+    # (aiohttp decompresses gzip/deflate responses on the fly)
+    headers = {"Accept-Encoding": "identity", **(headers or {})}
+
+    def request_kwargs() -> dict:
+        kwargs = _request_kwargs(cookies, headers, params, None, proxy, timeout)
+        if resume and (size := _part_size(part)):
+            kwargs["headers"] = {**headers, "Range": "bytes=%d-" % size}
+        elif _os.path.exists(part):
+            _os.remove(part)
+        return kwargs
+
+    async def read(res: _ClientResponse) -> None:
+        # Range not satisfiable: the partial file is complete or invalid
+        if res.status == 416:
+            if _content_range(res)[2] == _part_size(part):
+                return None
+            _os.remove(part)
+            raise _ClientPayloadError("invalid partial download, restarting")
+        res.raise_for_status()
+
+        if res.status == 206:
+            start, _, total = _content_range(res)
+            if start is None or start > _part_size(part):
+                _os.remove(part)
+                raise _ClientPayloadError("unexpected Content-Range, restarting")
+        else:
+            start, total = 0, res.content_length
+            # encoded anyway: the length is the one of the compressed body
+            if res.headers.get("Content-Encoding", "identity") != "identity":
+                total = None
+        with open(part, "r+b" if start else "wb") as file:
+            file.seek(start)
+            file.truncate()
+            async for chunk in res.content.iter_chunked(chunk_size):
+                file.write(chunk)
+        if total is not None and (size := _part_size(part)) != total:
+            raise _ClientPayloadError(
+                "incomplete download, %d of %d bytes received" % (size, total)
+            )
+
+    try:
+        await _request(url, read, client, policy, retry, request_kwargs)
+        if checksum is not None:
+            digest = await asyncio.get_running_loop().run_in_executor(
+                None, _file_digest, part, algorithm
+            )
+            if digest.lower() != checksum.lower():
+                _os.remove(part)
+                raise ValueError(
+                    "checksum mismatch, expected %s '%s' instead got '%s'"
+                    % (algorithm, checksum, digest)
+                )
+        _os.replace(part, path)
+        return path
+    except Exception as err:
+        err.add_note(
+            f"<http_util.download_file> Failed to download file from: '{url}' to: '{path}'"
+        )
+        raise
+
+
+def _extract(
+    body: bytes,
+    selectors: dict[str, str | tuple[str, str]],
+    first: bool,
+) -> dict[str, list[str | None] | str | None]:
+    """Parse `body` and return only the selected text & attributes"""
+
+    tree = _HTMLParser(body)
+    res = {}
+    for name, selector in selectors.items():
+        if isinstance(selector, str):
+            values = [node.text(strip=True) for node in tree.css(selector)]
+        else:
+            css, attr = selector
+            values = [node.attributes.get(attr) for node in tree.css(css)]
+        res[name] = (values[0] if values else None) if first else values
+    return res
+
+
+async def extract(
+    url: str,
+    selectors: dict[str, str | tuple[str, str]],
+    *,
+    first: bool = False,
+    executor: _Executor = None,
+    cookies: dict = None,
+    headers: dict = None,
+    params: dict = None,
+    data: dict = None,
+    proxy: str = None,
+    timeout: int = None,
+    retry: int = 1,
+    client: HttpClient = None,
+    policy: RetryPolicy = None,
+) -> dict[str, list[str | None] | str | None]:
+    """Request a url and extract text & attributes with css selectors
+
+    The page is parsed off the event loop and only the extracted values are
+    returned, so the parsed tree is freed right away.
+
+    :Example:
+    >>> await extract(url, {"title": "h1", "links": ("a", "href")})
+    >>> {"title": ["Title"], "links": ["/a", "/b"]}
+
+    :param url: url to be requested
+    :param selectors: name -> selector of the values to be extracted
+        - `"css"`: text of the matching nodes
+        - `("css", "attr")`: attribute of the matching nodes
+    :param first: whether to return only the first match (or `None`)
+        instead of a list of all matches
+    :param executor: executor to parse the page in, e.g. a
+        `ProcessPoolExecutor`, default to the event loop's default executor
+    :param cookies: cookies to be sent with request
+    :param headers: headers to be sent with request
+    :param params: params to be sent with request
+    :param data: data to be sent with request
+    :param proxy: proxy to be used for request
+    :param timeout: timeout for request
+    :param retry: number of attempts, failures are retried according to `policy`
+        (a retryable status, e.g. 503, on the last attempt raises
+        `aiohttp.ClientResponseError`, other statuses, e.g. 404, are read
+        like any response)
+    :param client: `HttpClient` to send the request with, default to `default_client()`
+    :param policy: `RetryPolicy` deciding which failures to retry and how long
+        to wait in between, default to `RetryPolicy()`
+    :return: name -> extracted values <class 'dict'>
+    """
+
+    try:
+        body = await _request(
+            url,
+            _read_bytes,
+            client,
+            policy,
+            retry,
+            _request_kwargs(cookies, headers, params, data, proxy, timeout),
+        )
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, _extract, body, selectors, first
+        )
+    except Exception as err:
+        err.add_note(f"<http_util.extract> Failed to extract from: '{url}'")
+        raise
+
+
+async def _request_bytes(
+    url: str,
+    *,
+    cookies: dict = None,
+    headers: dict = None,
+    params: dict = None,
+    data: dict = None,
+    proxy: str = None,
+    timeout: int = None,
+    retry: int = 1,
+    client: HttpClient = None,
+    policy: RetryPolicy = None,
+) -> bytes:
+    """Request raw response body from a url
+
+    :param url: url to be requested
+    :param cookies: cookies to be sent with request
+    :param headers: headers to be sent with request
+    :param params: params to be sent with request
+    :param data: data to be sent with request
+    :param proxy: proxy to be used for request
+    :param timeout: timeout for request
+    :param retry: number of attempts, failures are retried according to `policy`
+        (a retryable status, e.g. 503, on the last attempt raises
+        `aiohttp.ClientResponseError`, other statuses, e.g. 404, are read
+        like any response)
+    :param client: `HttpClient` to send the request with, default to `default_client()`
+    :param policy: `RetryPolicy` deciding which failures to retry and how long
+        to wait in between, default to `RetryPolicy()`
+    :return: response body <class 'bytes'>
+    """
+
+    try:
+        return await _request(
+            url,
+            _read_bytes,
+            client,
+            policy,
+            retry,
+            _request_kwargs(cookies, headers, params, data, proxy, timeout),
+        )
+    except Exception as err:
+        err.add_note(
+            f"<http_util._request_bytes> Failed to request bytes from: '{url}'"
+        )
+        raise
+
+
+_FETCHERS: dict[str, callable] = {
+    "source": request_source,
+    "json": request_json,
+    "bytes": _request_bytes,
+}
+
+
+class _RateLimiter:
+    """Space out requests to `rate` per second"""
+
+    def __init__(self, rate: float) -> None:
+        self.__interval: float = 1 / rate
+        self.__next: float = 0
+
+    async def wait(self) -> None:
+        now = _monotonic()
+        slot = max(now, self.__next)
+        self.__next = slot + self.__interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def fetch_many(
+    urls: Iterable[str],
+    *,
+    kind: str = "source",
+    concurrency: int = 10,
+    per_host: int = None,
+    rate: float = None,
+    return_exceptions: bool = False,
+    progress: _ProgressBar = None,
+    client: HttpClient = None,
+    **kwargs,
+) -> AsyncIterator[tuple[str, object]]:
+    """Fetch many urls concurrently, yielding results in completion order
+
+    At most `concurrency` requests are in flight, and at most `concurrency`
+    results are buffered: fetching pauses while the consumer is busy.
+
+    :Example:
+    >>> async for url, html in fetch_many(urls, concurrency=20, per_host=4):
+            ...
+
+    :param urls: urls to be requested
+    :param kind: how each response is read
+        - `"source"`: `selectolax.parser.HTMLParser` (see `request_source`)
+        - `"json"`: parsed json (see `request_json`)
+        - `"bytes"`: raw response body
+    :param concurrency: maximum number of requests in flight
+    :param per_host: maximum number of requests in flight to the same host,
+        `None` for no limit
+    :param rate: maximum number of requests started per second to the same
+        host, `None` for no limit
+    :param return_exceptions: whether to yield `(url, exception)` for failed
+        requests instead of raising the first failure
+    :param progress: `rest_util.ProgressBar` updated after each result
+    :param client: `HttpClient` to send the requests with, default to `default_client()`
+    :param kwargs: other keyword arguments for the request, e.g. `headers`, `retry`
+    :return: async iterator of `(url, result)`
+    """
+
+    if (fetch := _FETCHERS.get(kind)) is None:
+        raise ValueError(
+            f"<http_util.fetch_many> `kind` must be one of {list(_FETCHERS)}, instead got: '{kind}'"
+        )
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError(
+            "<http_util.fetch_many> `concurrency` must be a positive integer"
+        )
+
+    urls = list(urls)
+    if not (total := len(urls)):
+        return
+    client = client or default_client()
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    pending = iter(urls)
+    host_sems: dict[str, asyncio.Semaphore] = {}
+    host_limiters: dict[str, _RateLimiter] = {}
+
+    async def worker() -> None:
+        for url in pending:
+            host = _urlsplit(url).netloc
+            if per_host is None:
+                sem = _nullcontext()
+            elif (sem := host_sems.get(host)) is None:
+                sem = host_sems[host] = asyncio.Semaphore(per_host)
+            async with sem:
+                if rate is not None:
+                    if (limiter := host_limiters.get(host)) is None:
+                        limiter = host_limiters[host] = _RateLimiter(rate)
+                    await limiter.wait()
+                try:
+                    res = await fetch(url, client=client, **kwargs)
+                except Exception as err:
+                    if not return_exceptions:
+                        await results.put((url, err, True))
+                        return None
+                    res = err
+            await results.put((url, res, False))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, total))]
+    try:
+        for done in range(1, total + 1):
+            url, res, failed = await results.get()
+            if failed:
+                raise res
+            if progress is not None:
+                progress.update(done, total)
+            yield url, res
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
 
 
 async def parse(res: _ClientResponse) -> _HTMLParser:
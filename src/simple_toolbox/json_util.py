@@ -1,10 +1,157 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
-from typing import Type
-from json import load as _load, dump as _dump
-from json import loads as _loads, dumps as _dumps
+from io import BytesIO as _BytesIO
+from codecs import getincrementaldecoder as _getincrementaldecoder
+from typing import Any, Callable, Iterable, Iterator, Literal, Type, BinaryIO
+from typing import AsyncIterator
+from json import loads as _std_loads, dumps as _std_dumps
+from json import JSONDecoder as _JSONDecoder, JSONDecodeError as _JSONDecodeError
+import pyarrow as _pa
+from pyarrow import json as _pa_json
+from simple_toolbox.file_util import open_compressed as _open_compressed
+from simple_toolbox.file_util import atomic_write as _atomic_write
 
-__all__ = ["load", "save", "parse", "serialize"]
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+try:
+    import ujson as _ujson
+except ImportError:
+    _ujson = None
+
+__all__ = [
+    "load",
+    "save",
+    "parse",
+    "serialize",
+    "serialize_bytes",
+    "iter_jsonl",
+    "write_jsonl",
+    "iter_items",
+    "backend",
+    "set_backend",
+]
+
+
+# Backends -----------------------------------------------------------------------------
+# Every backend parses to the same objects as the stdlib `json`. Output is
+# always the text the stdlib would write: orjson only writes compact
+# (`separators=(",", ":")`) or `indent=2` output of plain json data (see
+# `_is_plain`), with `ensure_ascii` only when the result is pure ASCII;
+# anything else is written by the stdlib. ujson is only used for parsing.
+_BACKENDS: tuple[str] = tuple(
+    name for name, module in (("orjson", _orjson), ("ujson", _ujson)) if module
+) + ("json",)
+_BACKEND: str = _BACKENDS[0]
+
+
+def backend() -> str:
+    """Name of the JSON backend in use: 'orjson', 'ujson' or 'json'"""
+
+    return _BACKEND
+
+
+def set_backend(name: str | None = None) -> str:
+    """Select the JSON backend
+
+    :param name: 'orjson', 'ujson', 'json' (stdlib), or `None` to
+        auto-select the fastest installed one
+    :return: name of the selected backend
+    """
+
+    global _BACKEND
+
+    if name is None:
+        name = _BACKENDS[0]
+    elif name not in _BACKENDS:
+        raise ValueError(
+            "<json_util.set_backend> JSON backend '%s' is not available, "
+            "choose from: %s" % (name, _BACKENDS)
+        )
+    _BACKEND = name
+    return name
+
+
+_STR_TYPE: frozenset[type] = frozenset({str})
+
+
+def _is_plain(obj: object) -> bool:
+    """Whether `obj` only holds data orjson writes exactly like the stdlib:
+    dicts with `str` keys, lists, tuples, `str`, `int`, `bool`, `None`, and
+    finite floats the stdlib writes without an exponent. NaN/Infinity,
+    exponent floats ('1e+16', '1e-07'), subclasses (`Enum`, ...) and other
+    types (`UUID`, `datetime`, ...) are left to the stdlib. Integers beyond
+    64 bits make orjson raise, which falls back as well.
+    """
+
+    stack = [obj]
+    pop, extend = stack.pop, stack.extend
+    str_keys = _STR_TYPE.issuperset
+    while stack:
+        obj = pop()
+        cls = type(obj)
+        if cls is str or cls is int or cls is bool or obj is None:
+            continue
+        if cls is dict:
+            if not str_keys(map(type, obj)):
+                return False
+            extend(obj.values())
+        elif cls is list or cls is tuple:
+            extend(obj)
+        elif cls is float:
+            if not (1e-4 <= abs(obj) < 1e16 or obj == 0.0):
+                return False
+        else:
+            return False
+    return True
+
+
+def _loads(data: bytes | str) -> Any:
+    if _BACKEND == "orjson":
+        try:
+            return _orjson.loads(data)
+        except _orjson.JSONDecodeError:
+            # NaN/Infinity literals, or invalid json reported by the stdlib
+            pass
+    elif _BACKEND == "ujson":
+        try:
+            return _ujson.loads(data)
+        except ValueError:
+            pass
+    return _std_loads(data)
+
+
+def _dumps(
+    obj: object,
+    *,
+    indent: int | None = None,
+    compact: bool = False,
+    ensure_ascii: bool = True,
+    skipkeys: bool = False,
+    default: Callable | None = None,
+) -> bytes:
+    if _BACKEND == "orjson" and (compact and indent is None or indent == 2):
+        if _is_plain(obj):
+            try:
+                data = _orjson.dumps(
+                    obj, option=_orjson.OPT_INDENT_2 if indent == 2 else None
+                )
+            except _orjson.JSONEncodeError:
+                pass
+            else:
+                if not ensure_ascii or data.isascii():
+                    return data
+
+    return _std_dumps(
+        obj,
+        indent=indent,
+        separators=(",", ":") if compact else None,
+        ensure_ascii=ensure_ascii,
+        skipkeys=skipkeys,
+        default=default,
+    ).encode("utf-8")
 
 
 # Load JSON file
@@ -15,8 +162,13 @@ def load(path: str, *, encoding: str = "utf-8") -> dict:
         path += ".json"
 
     try:
-        with open(path, "r", encoding=encoding) as file:
-            return _load(file)
+        with open(path, "rb") as file:
+            data = file.read()
+        if encoding.lower().replace("-", "") not in ("utf8", "utf8sig"):
+            data = data.decode(encoding)
+        elif data.startswith(b"\xef\xbb\xbf"):
+            data = data[3:]
+        return _loads(data)
     except Exception as err:
         err.add_note(f"<json_util.load> Failed to load json file from: '{path}'")
         raise
@@ -30,23 +182,42 @@ def save(
     encoding: str = "utf-8",
     indent: int = 4,
     ensure_ascii: bool = True,
+    compact: bool = False,
+    fsync: bool = False,
+    lock: bool = False,
 ) -> None:
-    """Save `json` object to a file (path)"""
+    """Save `json` object to a file (path), atomically
+    (see `file_util.atomic_write`)
+
+    :param indent: indentation of the output, `None` for a single line
+    :param compact: single line without spaces after separators, the
+        smallest and fastest output (`indent` is ignored)
+    :param fsync: flush the file to disk before returning
+    :param lock: hold a file lock while writing, for multi-process writers
+    """
 
     if not path.endswith(".json"):
         path += ".json"
 
     try:
-        with open(path, "w", encoding=encoding) as file:
-            _dump(obj, file, indent=indent, ensure_ascii=ensure_ascii)
+        data = _dumps(
+            obj,
+            indent=None if compact else indent,
+            compact=compact,
+            ensure_ascii=ensure_ascii,
+        )
+        if encoding.lower().replace("-", "") != "utf8":
+            data = data.decode("utf-8").encode(encoding)
+        with _atomic_write(path, fsync=fsync, lock=lock) as file:
+            file.write(data)
     except Exception as err:
         err.add_note(f"<json_util.save> Failed to save json file to: '{path}'")
         raise
 
 
 # Parse JSON
-def parse(string: str) -> str | list | dict:
-    """Parse serialized `json` string"""
+def parse(string: str | bytes) -> str | list | dict:
+    """Parse serialized `json` string (or utf-8 bytes)"""
 
     try:
         return _loads(string)
@@ -64,14 +235,41 @@ def serialize(
     skipkeys: bool = False,
     ensure_ascii: bool = True,
     default: Type = str,
+    compact: bool = False,
 ) -> str:
-    """Serialize object to `json` string"""
+    """Serialize object to `json` string
+
+    :param compact: omit the spaces after separators
+    """
+
+    return serialize_bytes(
+        obj,
+        skipkeys=skipkeys,
+        ensure_ascii=ensure_ascii,
+        default=default,
+        compact=compact,
+    ).decode("utf-8")
+
+
+def serialize_bytes(
+    obj: object,
+    *,
+    skipkeys: bool = False,
+    ensure_ascii: bool = True,
+    default: Type = str,
+    compact: bool = False,
+) -> bytes:
+    """Serialize object to utf-8 encoded `json` bytes
+
+    :param compact: omit the spaces after separators
+    """
 
     try:
         return _dumps(
             obj,
-            skipkeys=skipkeys,
+            compact=compact,
             ensure_ascii=ensure_ascii,
+            skipkeys=skipkeys,
             default=default,
         )
     except Exception as err:
@@ -79,3 +277,379 @@ def serialize(
             f"<json_util.serialize> Failed to serialize object: '{obj}' {type(obj)}"
         )
         raise
+
+
+# JSON Lines ---------------------------------------------------------------------------
+def iter_jsonl(
+    path: str,
+    batch_size: int | None = None,
+    *,
+    schema: _pa.Schema | None = None,
+    to: Literal["arrow", "pandas"] = "arrow",
+    compression: str | None = "infer",
+) -> Iterator:
+    """Stream records from a `json lines` file (one json value per line)
+
+    Only one batch is held in memory at a time, blank lines are skipped.
+
+    :param path: path of the file, '.gz' / '.zst' / '.lz4' files are decompressed
+    :param batch_size: yield lists of up to `batch_size` records instead of
+        single records. With a `schema`, the number of lines per table
+    :param schema: `pyarrow.Schema` of the records, the lines of each batch
+        are then parsed by Arrow straight into a table, without building
+        python objects per row (`batch_size` defaults to 65536)
+    :param to: type of batches parsed with a `schema`: 'arrow' for
+        `pyarrow.Table`, 'pandas' for `pandas.DataFrame`
+    :param compression: 'gzip', 'zstd', 'lz4', None or 'infer'
+    """
+
+    if batch_size is not None and batch_size <= 0:
+        raise ValueError("<json_util.iter_jsonl> `batch_size` must be positive")
+    if to not in ("arrow", "pandas"):
+        raise ValueError("<json_util.iter_jsonl> `to` must be 'arrow' or 'pandas'")
+
+    try:
+        with _open_compressed(path, "rb", compression) as file:
+            if schema is not None:
+                yield from _iter_jsonl_tables(file, batch_size or 65536, schema, to)
+            elif batch_size is None:
+                for line in file:
+                    if not line.isspace():
+                        yield _loads(line)
+            else:
+                batch = []
+                for line in file:
+                    if not line.isspace():
+                        batch.append(_loads(line))
+                        if len(batch) == batch_size:
+                            yield batch
+                            batch = []
+                if batch:
+                    yield batch
+    except Exception as err:
+        err.add_note(f"<json_util.iter_jsonl> Failed to read json lines from: '{path}'")
+        raise
+
+
+def _iter_jsonl_tables(
+    file: BinaryIO,
+    batch_size: int,
+    schema: _pa.Schema,
+    to: str,
+) -> Iterator:
+    parse_options = _pa_json.ParseOptions(
+        explicit_schema=schema, unexpected_field_behavior="ignore"
+    )
+    lines = []
+    for line in file:
+        if not line.isspace():
+            lines.append(line)
+            if len(lines) == batch_size:
+                yield _jsonl_table(lines, parse_options, to)
+                lines = []
+    if lines:
+        yield _jsonl_table(lines, parse_options, to)
+
+
+def _jsonl_table(lines: list[bytes], parse_options, to: str):
+    if not lines[-1].endswith(b"\n"):
+        lines[-1] += b"\n"
+    data = b"".join(lines)
+    table = _pa_json.read_json(
+        _BytesIO(data),
+        read_options=_pa_json.ReadOptions(block_size=max(len(data), 1 << 20)),
+        parse_options=parse_options,
+    )
+    return table.to_pandas() if to == "pandas" else table
+
+
+def write_jsonl(
+    path: str,
+    iterable: Iterable,
+    *,
+    append: bool = False,
+    compression: str | None = "infer",
+    level: int | None = None,
+    ensure_ascii: bool = False,
+    default: Type = str,
+    buffer_size: int = 1 << 20,
+) -> int:
+    """Write each item of an iterable as one line of a `json lines` file
+
+    Lines are serialized compactly and written in bulk, once roughly
+    `buffer_size` bytes are pending.
+
+    :param path: path of the file, '.gz' / '.zst' / '.lz4' files are compressed
+    :param iterable: json serializable items, consumed lazily
+    :param append: append to the file instead of replacing it
+    :param compression: 'gzip', 'zstd', 'lz4', None or 'infer'
+    :param level: compression level, see `file_util.open_compressed`
+    :return: number of lines written
+    """
+
+    count = 0
+    try:
+        with _open_compressed(
+            path, "ab" if append else "wb", compression, level
+        ) as file:
+            pending, size = [], 0
+            for item in iterable:
+                line = _dumps(
+                    item, compact=True, ensure_ascii=ensure_ascii, default=default
+                )
+                pending.append(line)
+                size += len(line) + 1
+                count += 1
+                if size >= buffer_size:
+                    pending.append(b"")
+                    file.write(b"\n".join(pending))
+                    pending, size = [], 0
+            if pending:
+                pending.append(b"")
+                file.write(b"\n".join(pending))
+        return count
+    except Exception as err:
+        err.add_note(
+            f"<json_util.write_jsonl> Failed to write json lines to: '{path}' "
+            f"after {count} lines"
+        )
+        raise
+
+
+# Streaming Items ----------------------------------------------------------------------
+_WHITESPACE: str = " \t\n\r"
+_RAW_DECODE: Callable = _JSONDecoder().raw_decode
+
+
+class _ItemParser:
+    """Push parser yielding the items of one array in a json document
+
+    Text is fed in chunks, only the unconsumed tail and the item being
+    parsed are kept. Each item is parsed by the stdlib (C) scanner once
+    it is complete, a partial item is retried after the buffer doubled.
+    """
+
+    def __init__(self, prefix: str) -> None:
+        *keys, last = prefix.split(".")
+        if last != "item":
+            raise ValueError(
+                "`prefix` must end with 'item' (e.g. 'item' or 'data.rows.item'), "
+                "instead got: '%s'" % prefix
+            )
+        self.__keys: list[str] = keys
+        self.__level: int = 0
+        self.__decoder = _getincrementaldecoder("utf-8")()
+        self.__buffer: str = ""
+        self.__pos: int = 0
+        self.__need: int = 0
+        self.__final: bool = False
+        # open -> key -> colon_open / colon_skip -> skip -> next -> ...
+        # open -> first -> after -> item -> after -> ... -> done -> end
+        self.__state: str = "open"
+
+    def feed(self, data: bytes, final: bool = False) -> list:
+        """Feed the next chunk of the document, return the completed items"""
+
+        text = self.__decoder.decode(data, final)
+        if self.__pos:
+            self.__buffer = self.__buffer[self.__pos :] + text
+            self.__pos = 0
+        else:
+            self.__buffer += text
+        self.__final = final
+        if not final and len(self.__buffer) < self.__need:
+            return []
+        self.__need = 0
+        items = []
+        self.__parse(items)
+        if final and self.__state not in ("done", "end"):
+            raise _JSONDecodeError(
+                "Unexpected end of document", self.__buffer, len(self.__buffer)
+            )
+        return items
+
+    def __token(self) -> str | None:
+        buf, pos = self.__buffer, self.__pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self.__pos = pos
+        return buf[pos] if pos < len(buf) else None
+
+    def __decode(self) -> tuple[bool, Any]:
+        try:
+            value, end = _RAW_DECODE(self.__buffer, self.__pos)
+        except _JSONDecodeError:
+            if self.__final:
+                raise
+            # incomplete value, wait until the buffer doubled
+            self.__need = (len(self.__buffer) - self.__pos) * 2
+            return False, None
+        if isinstance(value, (int, float)) and not self.__final:
+            # a number could continue in the next chunk (e.g. '12' or '1.')
+            if end == len(self.__buffer) or self.__buffer[end] in ".eE+-":
+                return False, None
+        self.__pos = end
+        return True, value
+
+    def __expect(self, token: str, char: str) -> None:
+        if token != char:
+            raise _JSONDecodeError("Expecting '%s'" % char, self.__buffer, self.__pos)
+
+    def __parse(self, items: list) -> None:
+        while (token := self.__token()) is not None:
+            state = self.__state
+            # navigate through the object keys of the prefix
+            if state == "open":
+                if self.__level < len(self.__keys):
+                    self.__expect(token, "{")
+                    self.__state = "key"
+                else:
+                    self.__expect(token, "[")
+                    self.__state = "first"
+                self.__pos += 1
+            elif state == "key":
+                if token == "}":
+                    # key not found, no items
+                    self.__state = "done"
+                    self.__pos += 1
+                    continue
+                self.__expect(token, '"')
+                done, key = self.__decode()
+                if not done:
+                    return None
+                if key == self.__keys[self.__level]:
+                    self.__level += 1
+                    self.__state = "colon_open"
+                else:
+                    self.__state = "colon_skip"
+            elif state in ("colon_open", "colon_skip"):
+                self.__expect(token, ":")
+                self.__pos += 1
+                self.__state = "open" if state == "colon_open" else "skip"
+            elif state == "skip":
+                done, _ = self.__decode()
+                if not done:
+                    return None
+                self.__state = "next"
+            elif state == "next":
+                if token == "}":
+                    self.__state = "done"
+                else:
+                    self.__expect(token, ",")
+                    self.__state = "key"
+                self.__pos += 1
+            # the target array
+            elif state in ("first", "item"):
+                if token == "]" and state == "first":
+                    self.__state = "done"
+                    self.__pos += 1
+                    continue
+                done, value = self.__decode()
+                if not done:
+                    return None
+                items.append(value)
+                self.__state = "after"
+            elif state == "after":
+                if token == "]":
+                    self.__state = "done"
+                else:
+                    self.__expect(token, ",")
+                    self.__state = "item"
+                self.__pos += 1
+            # the rest of the document is not parsed
+            else:
+                self.__state = "end"
+                self.__pos = len(self.__buffer)
+                return None
+
+
+class _ItemStream:
+    """Iterator over the array items of a json document, `for` for paths
+    and file objects, `async for` for aiohttp responses and streams"""
+
+    def __init__(self, source: Any, prefix: str, chunk_size: int) -> None:
+        self.__source: Any = source
+        self.__prefix: str = prefix
+        self.__chunk_size: int = chunk_size
+
+    def __iter__(self) -> Iterator:
+        source = self.__source
+        parser = _ItemParser(self.__prefix)
+        try:
+            if isinstance(source, str):
+                with _open_compressed(source, "rb", "infer") as file:
+                    yield from self.__iter_file(file, parser)
+            elif hasattr(source, "read"):
+                yield from self.__iter_file(source, parser)
+            else:
+                raise TypeError(
+                    "Unsupported source %s, use `async for` for async streams"
+                    % type(source)
+                )
+        except Exception as err:
+            err.add_note(
+                f"<json_util.iter_items> Failed to stream items from: {source}"
+            )
+            raise
+
+    def __iter_file(self, file: BinaryIO, parser: _ItemParser) -> Iterator:
+        while chunk := file.read(self.__chunk_size):
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            yield from parser.feed(chunk)
+        yield from parser.feed(b"", True)
+
+    async def __aiter__(self) -> AsyncIterator:
+        source = self.__source
+        parser = _ItemParser(self.__prefix)
+        # aiohttp.ClientResponse -> StreamReader -> chunks
+        stream = getattr(source, "content", source)
+        if hasattr(stream, "iter_chunked"):
+            chunks = stream.iter_chunked(self.__chunk_size)
+        elif hasattr(stream, "__aiter__"):
+            chunks = stream
+        else:
+            raise TypeError(
+                "<json_util.iter_items> Unsupported async source %s, use `for` for "
+                "paths and file objects" % type(source)
+            )
+        try:
+            async for chunk in chunks:
+                for item in parser.feed(chunk):
+                    yield item
+            for item in parser.feed(b"", True):
+                yield item
+        except Exception as err:
+            err.add_note(
+                f"<json_util.iter_items> Failed to stream items from: {source}"
+            )
+            raise
+
+
+def iter_items(
+    source: str | BinaryIO | Any,
+    prefix: str = "item",
+    *,
+    chunk_size: int = 1 << 16,
+) -> _ItemStream:
+    """Stream the items of a (huge) json array one by one
+
+    Memory is bounded by the largest item plus one chunk, instead of the
+    whole document and all its parsed objects.
+
+    :param source: a path (compressed files are decompressed), a binary file
+        object, or for `async for`: an aiohttp response, `StreamReader`, or
+        any async iterable of bytes
+    :param prefix: location of the array, 'item' for the top-level array,
+        'data.rows.item' for the array at `doc["data"]["rows"]`
+    :param chunk_size: bytes read per chunk
+
+    :Example:
+    >>> for row in json_util.iter_items("rows.json"):
+            ...
+    >>> async with session.get(url) as res:
+            async for row in json_util.iter_items(res, "data.item"):
+                ...
+    """
+
+    return _ItemStream(source, prefix, chunk_size)
@@ -1,21 +1,36 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 import os as _os
+import errno as _errno
 import shutil as _shutil
+from re import compile as _re_compile
+from fnmatch import translate as _fnmatch_translate
+from typing import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+from concurrent.futures import wait as _wait, FIRST_COMPLETED as _FIRST_COMPLETED
+from concurrent.futures import as_completed as _as_completed
+from simple_toolbox import json_util as _json_util
+from simple_toolbox.hash_util import file_digest as _file_digest
 from simple_toolbox.cython_core.path_util_c import list_directory
+from simple_toolbox.cython_core.path_util_c import default_excludes as _default_excludes
 from simple_toolbox.cython_core.path_util_c import clean_path as _clean_path
+from simple_toolbox.cython_core.path_util_c import clean_paths as _clean_paths
 from simple_toolbox.cython_core.path_util_c import offset_path as _offset_path
 
 __all__ = [
     "clean",
+    "clean_many",
     "abs",
     "exists",
     "offset",
     "make",
     "join",
     "list_dir",
+    "walk",
+    "PathEntry",
     "move_dir",
     "copy_dir",
+    "sync_dir",
     "remove_dir",
     "move_file",
     "copy_file",
@@ -30,6 +45,13 @@ def clean(path: str) -> str:
     return _clean_path(path, _os.sep)
 
 
+# Clean Paths
+def clean_many(paths: list[str]) -> list[str]:
+    """Remove all invalid speical characters for a list of system directory paths"""
+
+    return _clean_paths(list(paths), _os.sep)
+
+
 # Absolute Path
 def abs(path: str) -> str:
     """Return the absolute path for a file or directory"""
@@ -92,30 +114,482 @@ def list_dir(dir: str, *excludes: str) -> list[str]:
     return list_directory(dir, excludes)
 
 
+# Walk Directory
+class PathEntry:
+    """A file or directory found by `walk()`
+
+    Built from `os.DirEntry`, so `is_dir` / `is_file` / `is_symlink`
+    come from the cached directory read. `size` & `mtime` are only
+    available when `walk(with_stat=True)`, otherwise `None`. A dangling
+    symlink reports the link's own `size` & `mtime`, an entry deleted
+    during the walk reports `None`.
+    """
+
+    __slots__ = (
+        "path",
+        "name",
+        "depth",
+        "is_dir",
+        "is_file",
+        "is_symlink",
+        "size",
+        "mtime",
+    )
+
+    def __init__(self, entry: _os.DirEntry, depth: int, with_stat: bool) -> None:
+        self.path: str = entry.path
+        self.name: str = entry.name
+        self.depth: int = depth
+        self.is_dir: bool = entry.is_dir()
+        self.is_file: bool = entry.is_file()
+        self.is_symlink: bool = entry.is_symlink()
+        self.size: int | None = None
+        self.mtime: float | None = None
+        if with_stat:
+            try:
+                st = entry.stat()
+            except OSError:
+                # dangling symlink: stat the link itself, or the entry was
+                # deleted since the directory was read: leave `None`
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    return None
+            self.size = st.st_size
+            self.mtime = st.st_mtime
+
+    def __repr__(self) -> str:
+        return "<PathEntry (path='%s', depth=%s, is_dir=%s, size=%s)>" % (
+            self.path,
+            self.depth,
+            self.is_dir,
+            self.size,
+        )
+
+
+def walk(
+    dir: str,
+    pattern: str = None,
+    *,
+    excludes: tuple[str] = None,
+    max_depth: int = None,
+    with_stat: bool = True,
+    follow_symlinks: bool = False,
+    workers: int = 1,
+) -> Iterator[PathEntry]:
+    """Recursively walk a directory with `os.scandir`
+
+    Files and directories are yielded as `PathEntry`. The order within a
+    directory follows `os.scandir`, and when `workers > 1` directories are
+    read concurrently so entries from different directories can interleave.
+    Sub-directories that can't be read are skipped (same as `os.walk`).
+
+    :param dir: root directory to walk
+    :param pattern: `fnmatch` style pattern on the entry name, e.g. `"*.csv"`
+        Only matching entries are yielded, but all sub-directories are walked.
+    :param excludes: file or folder names to be excluded (not walked into)
+        If not provided, the defaults of `list_dir` are used. Names starting
+        with `"._"` are always excluded.
+    :param max_depth: maximum depth to walk into, `0` means only `dir` itself
+        is listed, `None` means no limit
+    :param with_stat: whether to stat each entry for `size` & `mtime`
+    :param follow_symlinks: whether to walk into symlinked directories
+    :param workers: number of threads reading directories concurrently
+    :return: iterator of `PathEntry`
+    """
+
+    excl = frozenset(excludes) if excludes else _default_excludes()
+    match = _re_compile(_fnmatch_translate(pattern)).match if pattern else None
+
+    def scan(path: str, depth: int) -> tuple[list[PathEntry], list[str]]:
+        entries, subdirs = [], []
+        with _os.scandir(path) as it:
+            for entry in it:
+                if entry.name in excl or entry.name.startswith("._"):
+                    continue
+                if match is None or match(entry.name):
+                    entries.append(PathEntry(entry, depth, with_stat))
+                if (max_depth is None or depth < max_depth) and entry.is_dir(
+                    follow_symlinks=follow_symlinks
+                ):
+                    subdirs.append(entry.path)
+        return entries, subdirs
+
+    def scan_safe(path: str, depth: int) -> tuple[list[PathEntry], list[str]]:
+        # only failures to read the directory itself skip it, per-entry
+        # stat errors are handled by `PathEntry`
+        try:
+            return scan(path, depth)
+        except OSError:
+            return [], []
+
+    # Root directory
+    try:
+        entries, subdirs = scan(dir, 0)
+    except Exception as err:
+        err.add_note(f"<path_util.walk> Failed to walk directory: '{dir}'")
+        raise
+    yield from entries
+
+    # Sequential
+    if workers <= 1:
+        stack = [(subdir, 1) for subdir in reversed(subdirs)]
+        while stack:
+            path, depth = stack.pop()
+            entries, subdirs = scan_safe(path, depth)
+            yield from entries
+            stack.extend((subdir, depth + 1) for subdir in reversed(subdirs))
+        return None
+
+    # Concurrent
+    with _ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(scan_safe, subdir, 1): 1 for subdir in subdirs}
+        try:
+            while pending:
+                done, _ = _wait(pending, return_when=_FIRST_COMPLETED)
+                for fut in done:
+                    depth = pending.pop(fut)
+                    entries, subdirs = fut.result()
+                    for subdir in subdirs:
+                        pending[pool.submit(scan_safe, subdir, depth + 1)] = depth + 1
+                    yield from entries
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+
+# Tree Operations ---------------------------------------------------------------------
+# progress(files_done, total_files, bytes_done, total_bytes)
+ProgressCallback = Callable[[int, int, int, int], None]
+
+_COPY_CHUNK: int = 1 << 30
+_ZERO_COPY_ERRNOS: set[int] = {
+    _errno.ENOSYS,
+    _errno.EXDEV,
+    _errno.EINVAL,
+    _errno.EBADF,
+    _errno.EOPNOTSUPP,
+    _errno.ENOTSUP,
+}
+_ZERO_COPY_FUNCS: list[Callable[[int, int, int], int]] = []
+if hasattr(_os, "copy_file_range"):
+    _ZERO_COPY_FUNCS.append(lambda i, o, _: _os.copy_file_range(i, o, _COPY_CHUNK))
+if hasattr(_os, "sendfile") and _os.name == "posix":
+    _ZERO_COPY_FUNCS.append(lambda i, o, off: _os.sendfile(o, i, off, _COPY_CHUNK))
+
+
+def _copy_data(src: str, dst: str) -> int:
+    """Copy file content, in kernel space (`copy_file_range` / `sendfile`)
+    when the platform supports it, and return the number of bytes copied.
+    """
+
+    # opening `dst` would truncate `src` (same path, hardlink or symlink)
+    if _os.path.exists(dst) and _os.path.samefile(src, dst):
+        raise _shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        for func in _ZERO_COPY_FUNCS:
+            copied = 0
+            try:
+                while (size := func(infd, outfd, copied)) > 0:
+                    copied += size
+                return copied
+            except OSError as err:
+                if copied or err.errno not in _ZERO_COPY_ERRNOS:
+                    raise
+        _shutil.copyfileobj(fsrc, fdst)
+        return fdst.tell()
+
+
+def _copy(src: str, dst: str, full_meta: bool) -> int:
+    """Copy a file with permission bits (and full metadata if `full_meta`)"""
+
+    size = _copy_data(src, dst)
+    if full_meta:
+        _shutil.copystat(src, dst)
+    else:
+        _shutil.copymode(src, dst)
+    return size
+
+
+def _remove(path: str) -> int:
+    _os.unlink(path)
+    return 0
+
+
+def _scan_tree(
+    dir: str,
+    follow_symlinks: bool,
+    with_stat: bool,
+) -> tuple[list[str], list[tuple[str, _os.stat_result | None]]]:
+    """Return all sub-directories (pre-order) and files `(path, stat)` of a tree"""
+
+    dirs, files, stack = [], [], [dir]
+    while stack:
+        with _os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    dirs.append(entry.path)
+                    stack.append(entry.path)
+                elif with_stat:
+                    st = entry.stat(follow_symlinks=follow_symlinks)
+                    files.append((entry.path, st))
+                else:
+                    files.append((entry.path, None))
+    return dirs, files
+
+
+def _run_parallel(
+    func: Callable[[str, ...], int],
+    tasks: list[tuple],
+    total_bytes: int,
+    workers: int | None,
+    progress: ProgressCallback | None,
+) -> None:
+    """Run file operations on a thread pool, reporting each completion"""
+
+    if not tasks:
+        return None
+
+    done_files, done_bytes, total_files = 0, 0, len(tasks)
+    pool = _ThreadPoolExecutor(max_workers=workers)
+    try:
+        for fut in _as_completed([pool.submit(func, *task) for task in tasks]):
+            done_bytes += fut.result()
+            done_files += 1
+            if progress is not None:
+                progress(done_files, total_files, done_bytes, total_bytes)
+    except BaseException:
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    else:
+        pool.shutdown(wait=True)
+
+
+def _rstrip_sep(path: str) -> str:
+    return path.rstrip(_os.sep) or path
+
+
 # Move Directory
-def move_dir(src: str, dst: str) -> None:
-    """Move directory from source to destination"""
+def move_dir(
+    src: str,
+    dst: str,
+    *,
+    workers: int = None,
+    progress: ProgressCallback = None,
+) -> None:
+    """Move directory from source to destination
+
+    A plain rename when on the same file system, otherwise the tree is
+    copied and then removed on a thread pool (see `copy_dir`).
+    """
 
     if exists(src):
         make(offset(dst, -1))
-        _shutil.move(src, dst)
+        src = _rstrip_sep(src)
+        if _os.path.isdir(dst):
+            dst = _os.path.join(dst, _os.path.basename(src))
+        try:
+            _os.rename(src, dst)
+        except OSError:
+            copy_dir(src, dst, workers=workers, progress=progress)
+            remove_dir(src, workers=workers)
 
 
 # Copy Directory
-def copy_dir(src: str, dst: str) -> None:
-    """Copy directory from source to destination"""
+def copy_dir(
+    src: str,
+    dst: str,
+    *,
+    workers: int = None,
+    progress: ProgressCallback = None,
+) -> None:
+    """Copy directory from source to destination
+
+    Files are copied concurrently on a thread pool, in kernel space
+    (`copy_file_range` / `sendfile`) when the platform supports it,
+    together with their metadata (same as `shutil.copytree`).
+
+    :param src: source directory
+    :param dst: destination directory, must not exist
+    :param workers: number of copying threads, `None` for the default of
+        `concurrent.futures.ThreadPoolExecutor`
+    :param progress: callback called after each copied file with
+        `(files_done, total_files, bytes_done, total_bytes)`, e.g.
+        `lambda files, total, *_: bar.update(files, total)` for
+        a `rest_util.ProgressBar`
+    """
 
     if exists(src):
         make(offset(dst, -1))
-        _shutil.copytree(src, dst)
+        src, dst = _rstrip_sep(src), _rstrip_sep(dst)
+        try:
+            dirs, files = _scan_tree(src, True, progress is not None)
+            _os.makedirs(dst)
+            for dir in dirs:
+                _os.mkdir(dst + dir[len(src) :])
+            _run_parallel(
+                _copy,
+                [(path, dst + path[len(src) :], True) for path, _ in files],
+                sum(st.st_size for _, st in files) if progress else 0,
+                workers,
+                progress,
+            )
+            for dir in reversed(dirs):
+                _shutil.copystat(dir, dst + dir[len(src) :])
+            _shutil.copystat(src, dst)
+        except Exception as err:
+            err.add_note(f"<path_util.copy_dir> Failed to copy '{src}' to '{dst}'")
+            raise
+
+
+# Sync Directory
+def sync_dir(
+    src: str,
+    dst: str,
+    *,
+    compare: str = "mtime",
+    delete: bool = False,
+    manifest: str = None,
+    workers: int = None,
+    progress: ProgressCallback = None,
+) -> list[str]:
+    """Synchronize destination directory with source (rsync-style)
+
+    Only new or changed files are copied (concurrently, see `copy_dir`).
+    The state of the synchronized files is persisted in a manifest, so
+    unchanged files are recognized without touching the destination.
+
+    :param src: source directory
+    :param dst: destination directory, created if not exists
+    :param compare: how changed files are detected
+        - `"mtime"`: file size & modification time
+        - `"hash"`: file content digest (`hash_util.file_digest`), only
+          computed for files whose size or modification time changed
+    :param delete: whether to delete files in `dst` that are not in `src`
+    :param manifest: path of the manifest `json` file,
+        default to `".sync_manifest.json"` in `dst`
+    :param workers: number of threads comparing & copying files
+    :param progress: callback called after each checked (and copied if
+        changed) file with `(files_done, total_files, bytes_done, total_bytes)`
+    :return: relative paths of the copied files
+    """
+
+    if compare not in ("mtime", "hash"):
+        raise ValueError(
+            f"<path_util.sync_dir> `compare` must be 'mtime' or 'hash', instead got: '{compare}'"
+        )
+
+    src, dst = _rstrip_sep(src), _rstrip_sep(dst)
+    if manifest is None:
+        manifest = _os.path.join(dst, ".sync_manifest.json")
+    elif not manifest.endswith(".json"):
+        manifest += ".json"
+    use_hash = compare == "hash"
+    try:
+        prev: dict[str, list] = _json_util.load(manifest) if exists(manifest) else {}
+    except ValueError:
+        prev = {}
+    curr: dict[str, list] = {}
+    copied: list[str] = []
+
+    def sync(path: str, st: _os.stat_result) -> int:
+        rel = path[len(src) + 1 :]
+        target = _os.path.join(dst, rel)
+        state = [st.st_size, st.st_mtime_ns, None]
+        curr[rel] = state
+
+        # Unchanged since last sync
+        if (last := prev.get(rel)) and last[:2] == state[:2] and exists(target):
+            state[2] = last[2]
+            return st.st_size
+
+        try:
+            dst_st = _os.stat(target)
+        except FileNotFoundError:
+            dst_st = None
+        if use_hash:
+            state[2] = _file_digest(path)
+            if dst_st is not None and dst_st.st_size == st.st_size:
+                if state[2] == (last and last[2] or _file_digest(target)):
+                    _shutil.copystat(path, target)
+                    return st.st_size
+        elif (
+            dst_st is not None
+            and dst_st.st_size == st.st_size
+            and dst_st.st_mtime_ns == st.st_mtime_ns
+        ):
+            return st.st_size
+
+        _copy(path, target, True)
+        copied.append(rel)
+        return st.st_size
+
+    try:
+        dirs, files = _scan_tree(src, True, True)
+        _os.makedirs(dst, exist_ok=True)
+        for dir in dirs:
+            _os.makedirs(dst + dir[len(src) :], exist_ok=True)
+        _run_parallel(
+            sync,
+            files,
+            sum(st.st_size for _, st in files),
+            workers,
+            progress,
+        )
+
+        if delete:
+            src_dirs = {dir[len(src) + 1 :] for dir in dirs}
+            dst_dirs, dst_files = _scan_tree(dst, False, False)
+            for path, _ in dst_files:
+                if path != manifest and path[len(dst) + 1 :] not in curr:
+                    _os.unlink(path)
+            for dir in reversed(dst_dirs):
+                if dir[len(dst) + 1 :] not in src_dirs:
+                    _os.rmdir(dir)
+
+        _json_util.save(curr, manifest, compact=True)
+    except Exception as err:
+        err.add_note(f"<path_util.sync_dir> Failed to sync '{src}' to '{dst}'")
+        raise
+
+    return copied
 
 
 # Delete Directory
-def remove_dir(dir: str) -> None:
-    """Delete directory"""
+def remove_dir(
+    dir: str,
+    *,
+    workers: int = None,
+    progress: ProgressCallback = None,
+) -> None:
+    """Delete directory
+
+    Files are unlinked concurrently on a thread pool, then the (now empty)
+    directories are removed bottom-up. Symlinks are removed, not followed.
+
+    :param dir: directory to delete
+    :param workers: number of deleting threads, `None` for the default of
+        `concurrent.futures.ThreadPoolExecutor`
+    :param progress: callback called after each deleted file with
+        `(files_done, total_files, 0, 0)`
+    """
 
     if exists(dir):
-        _shutil.rmtree(dir)
+        if _os.path.islink(dir):
+            raise OSError(
+                f"<path_util.remove_dir> Cannot remove symbolic link: '{dir}'"
+            )
+        try:
+            dirs, files = _scan_tree(dir, False, False)
+            _run_parallel(_remove, [(p,) for p, _ in files], 0, workers, progress)
+            for sub in reversed(dirs):
+                _os.rmdir(sub)
+            _os.rmdir(dir)
+        except Exception as err:
+            err.add_note(f"<path_util.remove_dir> Failed to delete '{dir}'")
+            raise
 
 
 # Move File
@@ -129,14 +603,17 @@ def move_file(src: str, dst: str) -> None:
 
 # Copy File
 def copy_file(src: str, dst: str, fullMeta: bool = False) -> None:
-    """Copy file from source to destination"""
+    """Copy file from source to destination
+
+    Content is copied in kernel space (`copy_file_range` / `sendfile`)
+    when the platform supports it.
+    """
 
     if exists(src):
         make(offset(dst, -1))
-        if fullMeta:
-            _shutil.copy2(src, dst)
-        else:
-            _shutil.copy(src, dst)
+        if _os.path.isdir(dst):
+            dst = _os.path.join(dst, _os.path.basename(src))
+        _copy(src, dst, fullMeta)
 
 
 # Delete File
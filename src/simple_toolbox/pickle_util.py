@@ -1,14 +1,108 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
+import os
+import mmap as _mmap
+import re as _re
+from secrets import token_hex as _token_hex
+from typing import BinaryIO
+from struct import Struct as _Struct
 from pickle import dump as _dump, load as _load
+from pickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL, PickleBuffer as _PickleBuffer
+from contextlib import nullcontext as _nullcontext
+from simple_toolbox.file_util import open_compressed as _open_compressed
+from simple_toolbox.file_util import atomic_write as _atomic_write
+from simple_toolbox.file_util import file_lock as _file_lock
 
 __all__ = ["load", "save"]
 
 
-def load(path: str, *, encoding: str = "ASCII", errors: str = "strict") -> object:
+# Out-of-band buffers ------------------------------------------------------------------
+# Sidecar file '<path>.pkl.<token>.buffers' of a pickle saved with
+# `out_of_band=True`:
+# magic | count (u64) | count * (offset (u64), length (u64)) | buffers
+# Every buffer starts at a 64-byte aligned offset, so it can be memory-mapped
+# straight into (e.g.) numpy arrays. Each save writes a new sidecar, whose
+# name the pickle records in a header `(_BUFFERS_MAGIC, name)` pickled before
+# the object, so a pickle is never read with the buffers of another save.
+_BUFFERS_EXT: str = ".buffers"
+_BUFFERS_MAGIC: bytes = b"PKLBUF01"
+_BUFFERS_ALIGN: int = 64
+_U64: _Struct = _Struct("<Q")
+_U64_PAIR: _Struct = _Struct("<QQ")
+
+
+def _write_buffers(file: BinaryIO, buffers: list[memoryview]) -> None:
+    header = len(_BUFFERS_MAGIC) + _U64.size + _U64_PAIR.size * len(buffers)
+    offset = -header % _BUFFERS_ALIGN + header
+    table = []
+    for buf in buffers:
+        table.append(_U64_PAIR.pack(offset, buf.nbytes))
+        offset += -buf.nbytes % _BUFFERS_ALIGN + buf.nbytes
+
+    file.write(_BUFFERS_MAGIC + _U64.pack(len(buffers)) + b"".join(table))
+    for buf in buffers:
+        file.write(bytes(-file.tell() % _BUFFERS_ALIGN))
+        file.write(buf)
+
+
+def _read_buffers(path: str, mmap: bool) -> list[memoryview]:
+    with open(path, "rb") as file:
+        if mmap:
+            # private (copy-on-write) mapping: zero-copy until written to
+            data = memoryview(_mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_COPY))
+        else:
+            data = memoryview(bytearray(file.read()))
+
+    if data[: len(_BUFFERS_MAGIC)] != _BUFFERS_MAGIC:
+        raise ValueError("Invalid pickle buffers file: '%s'" % path)
+    pos = len(_BUFFERS_MAGIC)
+    (count,) = _U64.unpack_from(data, pos)
+    pos += _U64.size
+    buffers = []
+    for _ in range(count):
+        offset, length = _U64_PAIR.unpack_from(data, pos)
+        pos += _U64_PAIR.size
+        buffers.append(data[offset : offset + length])
+    return buffers
+
+
+def _sidecars(path: str) -> list[str]:
+    # exactly '<name>.<8 hex>.buffers', not those of 'name.pkl.v2' etc.
+    directory, name = os.path.split(path)
+    pattern = _re.compile(
+        _re.escape(name) + r"\.[0-9a-f]{8}" + _re.escape(_BUFFERS_EXT)
+    )
+    return [
+        os.path.join(directory, entry)
+        for entry in os.listdir(directory)
+        if pattern.fullmatch(entry)
+    ]
+
+
+def _is_header(obj: object) -> bool:
+    return (
+        type(obj) is tuple
+        and len(obj) == 2
+        and type(obj[0]) is bytes
+        and obj[0] == _BUFFERS_MAGIC
+    )
+
+
+def load(
+    path: str,
+    *,
+    encoding: str = "ASCII",
+    errors: str = "strict",
+    mmap: bool = True,
+) -> object:
     """Load pickled object from a path
 
+    Compressed pickles are detected and decompressed while reading.
+
     :param path: path of pickled object to be loaded
+    :param mmap: memory-map the out-of-band buffers (if saved with
+        `out_of_band=True`), objects then share the pages of the file
+        (copy-on-write) instead of reading them into memory
     :return: unpickled object
     """
 
@@ -16,26 +110,111 @@ def load(path: str, *, encoding: str = "ASCII", errors: str = "strict") -> objec
         path += ".pkl"
 
     try:
-        with open(path, "rb") as file:
-            return _load(file, encoding=encoding, errors=errors)
+        directory = os.path.dirname(os.path.realpath(path))
+        for attempt in range(2):
+            with _open_compressed(path, "rb", "infer") as file:
+                obj = _load(file, encoding=encoding, errors=errors)
+                if not _is_header(obj):
+                    return obj
+                try:
+                    buffers = _read_buffers(os.path.join(directory, obj[1]), mmap)
+                except FileNotFoundError:
+                    # replaced by a new save since opened, read that one
+                    if attempt:
+                        raise
+                    continue
+                return _load(file, encoding=encoding, errors=errors, buffers=buffers)
     except Exception as err:
         err.add_note(f"<pickle_util.load> Unable to load pickle from: '{path}'")
         raise
 
 
-def save(obj: object, path: str) -> None:
-    """Save object as pickle to a path
+def save(
+    obj: object,
+    path: str,
+    *,
+    protocol: int = _HIGHEST_PROTOCOL,
+    out_of_band: bool = False,
+    compression: str | None = None,
+    level: int | None = None,
+    fsync: bool = False,
+    lock: bool = False,
+) -> None:
+    """Save object as pickle to a path, atomically
+    (see `file_util.atomic_write`)
 
     :param obj: object to be saved as pickle
     :param path: save path
+    :param protocol: pickle protocol, defaults to the highest (5)
+    :param out_of_band: write the large buffers of objects supporting
+        protocol 5 (numpy arrays, pandas/arrow data) raw to a sidecar file
+        '<path>.pkl.<token>.buffers' instead of copying them into the pickle,
+        `load()` can then memory-map them. The sidecar of the previous save
+        is removed once the new pickle has replaced it
+    :param compression: 'gzip', 'zstd' or 'lz4', the pickle is compressed
+        while it is written (not with `out_of_band`, whose buffers must
+        stay raw to be memory-mapped)
+    :param level: compression level, see `file_util.open_compressed`
+    :param fsync: flush the file(s) to disk before returning
+    :param lock: hold a file lock while writing, for multi-process writers
     """
 
     if not path.endswith(".pkl"):
         path += ".pkl"
 
     try:
-        with open(path, "wb") as file:
-            _dump(obj, file)
+        if out_of_band and compression is not None:
+            raise ValueError("`out_of_band` buffers can't be compressed")
+        if out_of_band and protocol < 5:
+            raise ValueError("`out_of_band` buffers require pickle protocol 5")
+
+        buffers = []
+
+        def buffer_callback(buf: _PickleBuffer) -> bool:
+            try:
+                buffers.append(buf.raw())
+            except BufferError:
+                # non-contiguous, serialize in-band
+                return True
+            return False
+
+        real = os.path.realpath(path)
+        name = "%s.%s%s" % (os.path.basename(real), _token_hex(4), _BUFFERS_EXT)
+        sidecar = os.path.join(os.path.dirname(real), name) if out_of_band else None
+
+        with _file_lock(real) if lock else _nullcontext():
+            try:
+                with _atomic_write(
+                    path, compression=compression, level=level, fsync=fsync
+                ) as file:
+                    if out_of_band:
+                        _dump((_BUFFERS_MAGIC, name), file, protocol=protocol)
+                    _dump(
+                        obj,
+                        file,
+                        protocol=protocol,
+                        buffer_callback=buffer_callback if out_of_band else None,
+                    )
+                    # a new file, in place before the pickle referring to it
+                    if out_of_band:
+                        with _atomic_write(sidecar, fsync=fsync) as bfile:
+                            _write_buffers(bfile, buffers)
+            except BaseException:
+                if sidecar is not None:
+                    _remove(sidecar)
+                raise
+
+            # buffers of previous saves
+            for stale in _sidecars(real):
+                if stale != sidecar:
+                    _remove(stale)
     except Exception as err:
         err.add_note(f"<pickle_util.save> Unable to save pickle to: '{path}'")
         raise
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,15 +1,212 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
+import os
+import sys
 import asyncio
+import logging
+from typing import Any, Callable
+from collections import deque
+from threading import Event as _Event
+from threading import Lock as _Lock
+from threading import Thread as _Thread
+from threading import local as _local
 from math import floor as _math_floor
 from time import perf_counter as _perf_counter
+from multiprocessing.shared_memory import SharedMemory as _SharedMemory
 from simple_toolbox.dt_util import seconds_to_time as _seconds_to_time
 
-__all__ = ["ProgressBar"]
+__all__ = ["ProgressCounter", "ProgressBar", "logging_exporter"]
+
+
+# Progress Counter
+class ProgressWorker:
+    """A single slot of a `ProgressCounter`, written by one worker only"""
+
+    __slots__ = ("__slots", "__index", "__shm")
+
+    def __init__(self, memory: memoryview, index: int, shm: _SharedMemory = None):
+        self.__slots: memoryview = memory.cast("q")
+        self.__index: int = index
+        self.__shm: _SharedMemory = shm
+
+    @property
+    def index(self) -> int:
+        return self.__index
+
+    def add(self, n: int = 1) -> None:
+        """Add `n` finished tasks to this worker's slot"""
+
+        self.__slots[self.__index] += n
+
+    def __reduce__(self) -> tuple:
+        if self.__shm is None:
+            raise TypeError(
+                "<ProgressWorker> only workers of a `shared=True` counter "
+                "can be sent to other processes"
+            )
+        return (_attach_worker, (self.__shm.name, self.__index))
+
+    def __del__(self) -> None:
+        # Release the view first, so the shared memory can be closed.
+        self.__slots.release()
+
+
+def _attach_worker(name: str, index: int) -> ProgressWorker:
+    shm = _SharedMemory(name=name)
+    return ProgressWorker(shm.buf, index, shm)
+
+
+class ProgressCounter:
+    """Lock-free progress counter for thread and process pools
+
+    Every worker owns one 8-byte slot and is the only writer of it, so
+    increments never take a lock. Readers (e.g. a `ProgressBar`) sum all
+    slots through `value`. Slots are claimed once per worker:
+    - `add(n)`: claims a slot for the calling thread on first use.
+    - `worker()`: claims a slot explicitly; with `shared=True` the
+      returned `ProgressWorker` can be passed to a process pool.
+
+    :Example:
+    >>> with ProgressCounter(workers=4, shared=True) as counter:
+            bar.start(len(chunks), counter)
+            with ProcessPoolExecutor(4) as pool:
+                for chunk, worker in zip(chunks, counter.workers(4)):
+                    pool.submit(process_chunk, chunk, worker)
+            bar.stop()
+    """
+
+    def __init__(self, workers: int = 64, shared: bool = False) -> None:
+        """
+        :param workers: maximum number of worker slots
+        :param shared: keep the slots in shared memory, so workers in
+            other processes can write to them
+        """
+        if not isinstance(workers, int) or workers <= 0:
+            raise ValueError("<ProgressCounter> `workers` must be a positive integer")
+
+        self.__size: int = workers
+        self.__shm: _SharedMemory = None
+        if shared:
+            self.__shm = _SharedMemory(create=True, size=workers * 8)
+            self.__shm.buf[:] = bytes(workers * 8)
+            self.__memory: memoryview = memoryview(self.__shm.buf)
+        else:
+            self.__memory: memoryview = memoryview(bytearray(workers * 8))
+        self.__slots: memoryview = self.__memory.cast("q")
+        self.__claimed: int = 0
+        self.__claim_lock: _Lock = _Lock()
+        self.__local: _local = _local()
+        self.__pid: int = os.getpid()
+
+    @property
+    def value(self) -> int:
+        """Total finished tasks of all workers"""
+        return sum(self.__slots)
+
+    @property
+    def shared(self) -> bool:
+        return self.__shm is not None
+
+    def worker(self) -> ProgressWorker:
+        """Claim a new worker slot"""
+
+        if os.getpid() != self.__pid:
+            raise RuntimeError(
+                "<ProgressCounter.worker> slots can only be claimed in the "
+                "process that created the counter, pass a `ProgressWorker` instead"
+            )
+        with self.__claim_lock:
+            if self.__claimed >= self.__size:
+                raise RuntimeError(
+                    "<ProgressCounter.worker> all %s worker slots are claimed"
+                    % self.__size
+                )
+            index = self.__claimed
+            self.__claimed += 1
+        return ProgressWorker(self.__memory, index, self.__shm)
+
+    def workers(self, n: int) -> list[ProgressWorker]:
+        """Claim `n` new worker slots"""
+
+        return [self.worker() for _ in range(n)]
+
+    def add(self, n: int = 1) -> None:
+        """Add `n` finished tasks to the calling thread's slot"""
+
+        try:
+            self.__local.worker.add(n)
+        except AttributeError:
+            self.__local.worker = self.worker()
+            self.__local.worker.add(n)
+
+    def reset(self) -> None:
+        """Zero all slots, claimed slots stay claimed"""
+
+        self.__memory[:] = bytes(self.__size * 8)
+
+    def close(self) -> None:
+        """Release the shared memory (if any)"""
+
+        if self.__shm is None:
+            return None
+        self.__slots.release()
+        self.__memory.release()
+        try:
+            self.__shm.close()
+        except BufferError:
+            # Workers still hold views, the segment closes along with them.
+            pass
+        if os.getpid() == self.__pid:
+            try:
+                self.__shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.__shm = None
+
+    def __enter__(self) -> "ProgressCounter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __reduce__(self) -> tuple:
+        raise TypeError(
+            "<ProgressCounter> pass `counter.worker()` to other processes instead"
+        )
 
 
 # Custom Async Progress Bar
 class ProgressBar:
+    """Progress bar for async (and sync) tasks
+
+    The bar is redrawn in the background every `frequency` seconds, so
+    reporting progress never waits on rendering:
+    - `await setup(total)`: render from a task of the running loop.
+    - `start(total)` / `stop()`: render from a thread, for sync code.
+
+    Progress is reported by one of:
+    - `advance(n)`: add `n` finished tasks, the cheapest way to report.
+    - `show(finish)` / `update(finish)`: set the absolute finished count.
+    - a `ProgressCounter` passed to `setup()` / `start()`, which the
+      renderer reads, for workers in thread or process pools.
+    - `observe(latency)`: record the latency of one item, reported as
+      p50/p90/p99 percentiles.
+
+    The speed and eta follow an exponentially weighted moving average
+    of the rate between renders (`smoothing`), so they adapt when the
+    throughput changes. Every render also builds a metrics record
+    (`dict`) passed to `exporter`, which can feed logs when there is no
+    TTY to draw the bar on (see `logging_exporter`).
+
+    :Example:
+    >>> bar = ProgressBar(desc="Crawl")
+    >>> await bar.setup(len(urls))
+    >>> for url in urls:
+            await crawl(url)
+            bar.advance()
+    >>> await bar.finish()
+    """
+
     def __init__(
         self,
         desc: str = None,
@@ -22,7 +219,22 @@ class ProgressBar:
         timer: bool = True,
         eta: bool = True,
         style: str = "▇",
+        smoothing: float = 0.3,
+        window: float = 10,
+        latencies: int = 1024,
+        exporter: Callable[[dict[str, Any]], None] = None,
+        display: bool = None,
     ) -> None:
+        """
+        :param smoothing: weight of the latest rate in the moving average,
+            1 only uses the latest rate, lower values smooth more
+        :param window: seconds of samples for the sliding window rate
+        :param latencies: number of latest item latencies kept for the
+            percentiles
+        :param exporter: called with a metrics record on every render
+        :param display: draw the bar on stdout, defaults to drawing when
+            stdout is a TTY or no `exporter` is given
+        """
         # params
         self.__desc: str = desc
         self.__bar_width: int = bar_width - 2
@@ -36,6 +248,14 @@ class ProgressBar:
         self.__timer: bool = timer
         self.__eta: bool = eta
         self.__style: str = style
+        if not 0 < smoothing <= 1:
+            raise ValueError("<Progress_Bar> `smoothing` must be in (0, 1]")
+        self.__smoothing: float = smoothing
+        self.__window: float = window
+        self.__exporter: Callable[[dict[str, Any]], None] = exporter
+        if display is None:
+            display = exporter is None or sys.stdout.isatty()
+        self.__display: bool = display
         # track
         self.__total: int = 0
         self.__finish: int = 0
@@ -43,6 +263,15 @@ class ProgressBar:
         # handle
         self.__finish_setup: bool = False
         self.__finish_print: bool = False
+        self.__last_print: float = 0
+        self.__render_task: asyncio.Task = None
+        self.__render_thread: _Thread = None
+        self.__render_stop: _Event = _Event()
+        self.__counter: ProgressCounter = None
+        # metrics
+        self.__rate: float = None
+        self.__samples: deque[tuple[float, int]] = deque()
+        self.__latencies: deque[float] = deque(maxlen=latencies)
 
     @property
     def _progress(self) -> int:
@@ -62,76 +291,307 @@ class ProgressBar:
 
     @property
     def _speed(self) -> float:
+        if self.__rate is not None:
+            return self.__rate
         return self.__finish / self._runTime
 
     @property
     def _eta(self) -> float:
         if self.__total == 0:
             return 0
-        if self._speed == 0:
+        if (speed := self._speed) == 0:
             return 0
-        return (self.__total - self.__finish) / self._speed
+        return (self.__total - self.__finish) / speed
 
     @property
-    def __bar(self) -> float:
+    def metrics(self) -> dict[str, Any]:
+        """The metrics record of the current progress, reading it leaves
+        the rate averages (sampled on every render) untouched"""
+        return self.__metrics(False)
+
+    def __bar(self, finish: int) -> str:
         if self.__total == 0:
             return "|" + " " * self.__bar_width + "|"
 
-        count = _math_floor(self.__finish / self.__total * self.__bar_width)
+        count = _math_floor(finish / self.__total * self.__bar_width)
         return "|" + self.__style * count + " " * (self.__bar_width - count) + "|"
 
-    async def setup(self, total: int) -> None:
+    async def setup(self, total: int, counter: ProgressCounter = None) -> None:
+        """Set up the bar and render it from a task of the running loop
+
+        :param total: number of total tasks
+        :param counter: read the finished count from this counter
+        """
+
+        self.__setup(total, counter)
+        self.__render_task = asyncio.create_task(self.__render())
+
+    def start(self, total: int, counter: ProgressCounter = None) -> None:
+        """Set up the bar and render it from a background thread
+
+        :param total: number of total tasks
+        :param counter: read the finished count from this counter
+        """
+
+        self.__setup(total, counter)
+        self.__render_stop.clear()
+        self.__render_thread = _Thread(target=self.__render_sync, daemon=True)
+        self.__render_thread.start()
+
+    def stop(self) -> None:
+        """Stop the render thread and print the final line"""
+
+        if not self.__finish_setup:
+            return None
+
+        self.__stop_render()
+        self.__print_final()
+
+    def __setup(self, total: int, counter: ProgressCounter) -> None:
         if not isinstance(total, int) or total <= 0:
             raise ValueError("<Progress_Bar> `total` tasks must be a positive integer")
 
         # track
+        self.__stop_render()
         self.__reset()
         self.__total: int = total
+        self.__counter = counter
         self.__finish_setup = True
 
+    def advance(self, n: int = 1) -> None:
+        """Add `n` finished tasks, the bar is redrawn in the background"""
+
+        self.__finish += n
+
+    def observe(self, latency: float, n: int = 0) -> None:
+        """Record the latency (seconds) of one finished item
+
+        :param latency: seconds the item took
+        :param n: also `advance()` by `n` finished tasks
+        """
+
+        self.__latencies.append(latency)
+        if n:
+            self.__finish += n
+
     async def show(self, finish: int) -> None:
         if not self.__finish_setup:
             raise RuntimeError("<Progress_Bar.show> please call setup() method first")
 
         self.__finish = finish
+        if self.__finish >= self.__total:
+            await self.finish()
+        elif self.__render_task is None:
+            self.__print_throttled()
+
+    def update(self, finish: int, total: int = None) -> None:
+        """Update progress without awaiting, for synchronous callers
+        (e.g. the `progress` callback of `path_util.copy_dir`).
+
+        Without a background render task (not set up inside an event
+        loop), the bar is printed here at most once every `frequency`
+        seconds.
+
+        :param finish: number of finished tasks
+        :param total: number of total tasks, sets up the bar when provided
+        """
+
+        if total is not None and (not self.__finish_setup or total != self.__total):
+            if not isinstance(total, int) or total <= 0:
+                raise ValueError(
+                    "<Progress_Bar> `total` tasks must be a positive integer"
+                )
+            if not self.__finish_setup:
+                self.__reset()
+            self.__total = total
+            self.__finish_setup = True
+        if not self.__finish_setup:
+            raise RuntimeError("<Progress_Bar.update> please call setup() method first")
+
+        self.__finish = finish
+        if self.__render_task is not None or self.__render_thread is not None:
+            return None
         if self.__finish < self.__total:
-            print(
-                self.__format().ljust(self.__bar_width + self.__extra_width), end="\r"
-            )
-            await asyncio.sleep(self.__frequency)
+            self.__print_throttled()
         else:
-            await self.finish()
+            self.__print_final()
 
     async def finish(self) -> None:
         if not self.__finish_setup:
             return None
 
+        self.__stop_render()
+        self.__print_final()
+
+    async def __render(self) -> None:
+        try:
+            while self.__pull() < self.__total:
+                self.__print_line()
+                await asyncio.sleep(self.__frequency)
+            self.__print_final()
+        finally:
+            # `setup()` may have started a new task meanwhile
+            if self.__render_task is asyncio.current_task():
+                self.__render_task = None
+
+    def __render_sync(self) -> None:
+        while self.__pull() < self.__total:
+            self.__print_line()
+            if self.__render_stop.wait(self.__frequency):
+                return None
+        self.__print_final()
+
+    def __stop_render(self) -> None:
+        if self.__render_task is not None:
+            self.__render_task.cancel()
+            self.__render_task = None
+        if self.__render_thread is not None:
+            self.__render_stop.set()
+            self.__render_thread.join()
+            self.__render_thread = None
+
+    def __pull(self) -> int:
+        if self.__counter is not None:
+            self.__finish = self.__counter.value
+        return self.__finish
+
+    def __print_throttled(self) -> None:
+        if (now := _perf_counter()) - self.__last_print >= self.__frequency:
+            self.__last_print = now
+            self.__print_line()
+
+    def __print_line(self) -> None:
+        self.__sample()
+        self.__emit(self.__metrics(False))
+
+    def __print_final(self) -> None:
         self.__finish = self.__total
         if not self.__finish_print:
-            print(self.__format().ljust(self.__bar_width + self.__extra_width))
+            self.__emit(self.__metrics(True))
             self.__finish_print = True
 
-    def __format(self) -> str:
+    def __emit(self, metrics: dict[str, Any]) -> None:
+        if self.__exporter is not None:
+            self.__exporter(metrics)
+        if self.__display:
+            line = self.__format(metrics).ljust(self.__bar_width + self.__extra_width)
+            print(line, end="\n" if metrics["done"] else "\r")
+
+    def __sample(self) -> None:
+        # moving averages of the rate since the last sample, only taken
+        # by the renderer so reading `metrics` doesn't skew them
+        finish, now = self.__finish, _perf_counter()
+        samples = self.__samples
+        if samples and (elapsed := now - samples[-1][0]) > 0:
+            latest = (finish - samples[-1][1]) / elapsed
+            if self.__rate is None:
+                self.__rate = latest
+            else:
+                self.__rate += self.__smoothing * (latest - self.__rate)
+        samples.append((now, finish))
+        while len(samples) > 2 and now - samples[1][0] >= self.__window:
+            samples.popleft()
+
+    def __metrics(self, done: bool) -> dict[str, Any]:
+        # snapshot the counters, so every field is computed once
+        finish, total = self.__finish, self.__total
+        now = _perf_counter()
+        runtime = now - self.__start_time
+        average = finish / runtime if runtime > 0 else 0
+
+        if done:
+            rate = window = average
+        else:
+            begin, begin_finish = (
+                self.__samples[0] if self.__samples else (self.__start_time, 0)
+            )
+            window = (finish - begin_finish) / (now - begin) if now > begin else 0
+            rate = average if self.__rate is None else self.__rate
+
+        return {
+            "desc": self.__desc,
+            "finish": finish,
+            "total": total,
+            "percent": finish / total * 100 if total else 0,
+            "elapsed": runtime,
+            "rate": rate,
+            "rate_window": window,
+            "rate_average": average,
+            "eta": (total - finish) / rate if total and rate > 0 else None,
+            "latency": self.__percentiles(),
+            "done": done,
+        }
+
+    def __percentiles(self) -> dict[str, float]:
+        if not (latencies := sorted(self.__latencies)):
+            return {}
+        last = len(latencies) - 1
+        return {
+            "p50": latencies[round(last * 0.5)],
+            "p90": latencies[round(last * 0.9)],
+            "p99": latencies[round(last * 0.99)],
+        }
+
+    def __format(self, metrics: dict[str, Any]) -> str:
+        finish, total = metrics["finish"], metrics["total"]
+
         frt = []
         if self.__desc:
             frt.append(self.__desc)
-        frt.append(self.__bar)
+        frt.append(self.__bar(finish))
         if self.__count:
-            frt.append("%s/%s" % (self.__finish, self.__total))
+            frt.append("%s/%s" % (finish, total))
         if self.__percent:
-            frt.append("%s%" % self._progress)
+            frt.append("%s%%" % int(metrics["percent"]))
         if self.__speed:
-            frt.append("%s/s" % round(self._speed, 1))
+            frt.append("%s/s" % round(metrics["rate"], 1))
         if self.__timer:
-            frt.append("run %s" % _seconds_to_time(self._runTime))
+            frt.append("run %s" % _seconds_to_time(metrics["elapsed"]))
         if self.__eta:
-            frt.append("eta %s" % _seconds_to_time(self._eta))
+            frt.append("eta %s" % _seconds_to_time(metrics["eta"] or 0))
         return " ".join(frt)
 
     def __reset(self) -> None:
         self.__total: int = 0
         self.__finish: int = 0
         self.__start_time: float = _perf_counter()
+        self.__last_print: float = 0
+        self.__finish_print: bool = False
+        self.__rate: float = None
+        self.__samples.clear()
+        self.__latencies.clear()
 
     def __bool__(self) -> bool:
         return self.__finish < self.__total
+
+
+def logging_exporter(
+    logger: logging.Logger = None,
+    level: int = logging.INFO,
+) -> Callable[[dict[str, Any]], None]:
+    """Create a `ProgressBar` exporter that logs each metrics record
+
+    :param logger: logger to write to, defaults to this module's logger
+    :param level: logging level of the records
+    :return: exporter, the record is also passed as `extra={"progress": ...}`
+    """
+
+    logger = logger or logging.getLogger(__name__)
+
+    def export(metrics: dict[str, Any]) -> None:
+        latency = metrics["latency"]
+        logger.log(
+            level,
+            "%s %s/%s (%.1f%%) %.1f/s eta %s p50 %s p99 %s",
+            metrics["desc"] or "progress",
+            metrics["finish"],
+            metrics["total"],
+            metrics["percent"],
+            metrics["rate"],
+            "-" if metrics["eta"] is None else "%.1fs" % metrics["eta"],
+            "%.3fs" % latency["p50"] if latency else "-",
+            "%.3fs" % latency["p99"] if latency else "-",
+            extra={"progress": metrics},
+        )
+
+    return export
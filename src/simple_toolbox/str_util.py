@@ -1,8 +1,15 @@
 # /usr/bin/python
 # -*- coding: UTF-8 -*-
+import pyarrow as _pa
 from simple_toolbox.cython_core.str_util_c import parse_float as _parse_float
 from simple_toolbox.cython_core.str_util_c import parse_int as _parse_int
 from simple_toolbox.cython_core.str_util_c import parce_pct as _parce_pct
+from simple_toolbox.cython_core.str_util_c import (
+    parse_locale_float as _parse_locale_float,
+)
+from simple_toolbox.cython_core.str_util_c import (
+    parse_locale_floats as _parse_locale_floats,
+)
 from simple_toolbox.cython_core.str_util_c import replace_char as _replace_char
 from simple_toolbox.cython_core.str_util_c import replace_chars as _replace_chars
 from simple_toolbox.cython_core.str_util_c import (
@@ -10,16 +17,36 @@ from simple_toolbox.cython_core.str_util_c import (
 )
 from simple_toolbox.cython_core.str_util_c import extract_alphanumeric_underscore
 from simple_toolbox.cython_core.str_util_c import remove_indent as _remove_indent
+from simple_toolbox.cython_core.str_util_c import (
+    arrow_remove_double_spaces as _arrow_remove_double_spaces,
+)
+from simple_toolbox.cython_core.str_util_c import (
+    arrow_replace_chars as _arrow_replace_chars,
+)
+from simple_toolbox.cython_core.str_util_c import (
+    arrow_extract_alphanumeric_underscore as _arrow_extract_alphanum,
+)
+from simple_toolbox.cython_core.str_util_c import (
+    arrow_parse_float as _arrow_parse_float,
+)
 
 __all__ = [
     "parse_float",
     "parse_int",
     "parse_pct",
+    "parse_locale_float",
+    "parse_locale_floats",
     "remove_double_spaces",
     "replace_chars",
     "extract_alphanum",
+    "arrow_parse_float",
+    "arrow_remove_double_spaces",
+    "arrow_replace_chars",
+    "arrow_extract_alphanum",
 ]
 
+ArrowStrings = _pa.StringArray | _pa.LargeStringArray | _pa.ChunkedArray
+
 
 # Parse Float
 def parse_float(float_str: str, signed: bool = False) -> float:
@@ -91,6 +118,66 @@ def parse_pct(pct_str: str, signed: bool = False) -> float:
         raise
 
 
+# Parse locale-formatted float
+def parse_locale_float(text: str, locale: str = "en", signed: bool = False) -> float:
+    """Parse locale-formatted float from string in a single pass
+
+    Unicode digits (e.g. full-width `"１２"` or Arabic-Indic `"١٢"`), spaces,
+    currency symbols and `"+"` are recognized. Any other character raises
+    `ValueError`. `"("` is treated as a negative sign (accounting format).
+
+    :param text: string with a locale-formatted number to be parsed
+    :param locale: decides the decimal & grouping separators
+        - `"en"`: "1,234.56"
+        - `"eu"`: "1.234,56"
+        - `"fr"`: "1 234,56"
+        - `"ch"`: "1'234.56"
+        - `"ar"`: "١٬٢٣٤٫٥٦"
+        - `"auto"`: the rightmost of `"."` and `","` is the decimal separator
+          when both appear, otherwise a separator appearing exactly once is
+          the decimal separator (`"1,234"` -> `1.234`)
+
+    :param signed: whether the float is signed or not
+        - if `True`, any "-" will be treated as a negative sign
+        - if `False`, "-" will be ignored
+
+    :return: float number
+    """
+
+    try:
+        return _parse_locale_float(text, locale, signed)
+    except Exception as err:
+        err.add_note(
+            f"<str_util.parse_locale_float> Failed to parse float from '{text}' {type(text)}"
+        )
+        raise
+
+
+# Parse locale-formatted floats
+def parse_locale_floats(
+    texts: list[str | None],
+    locale: str = "en",
+    signed: bool = False,
+) -> list[float | None]:
+    """Parse locale-formatted floats from a list of strings
+
+    Bulk version of `parse_locale_float`, `None` values are kept as `None`.
+
+    :param texts: strings with locale-formatted numbers to be parsed
+    :param locale: decides the decimal & grouping separators, see `parse_locale_float`
+    :param signed: whether the floats are signed or not
+    :return: list of float numbers
+    """
+
+    try:
+        return _parse_locale_floats(list(texts), locale, signed)
+    except Exception as err:
+        err.add_note(
+            f"<str_util.parse_locale_floats> Failed to parse floats with locale '{locale}'"
+        )
+        raise
+
+
 # Remove double spaces
 def remove_double_spaces(text: str) -> str:
     """Remove all double spaces from string
@@ -172,3 +259,154 @@ def remove_indent(text: str) -> str:
     """
 
     return _remove_indent(text)
+
+
+# Arrow string arrays ---------------------------------------------------------------
+def _arrow_buffers(arr: _pa.Array, func: str) -> tuple:
+    """Return `(validity, offsets, data, offset, length, large)` of a string array"""
+
+    if _pa.types.is_string(arr.type):
+        large = False
+    elif _pa.types.is_large_string(arr.type):
+        large = True
+    else:
+        raise TypeError(
+            f"<str_util.{func}> Expect pyarrow `StringArray` or `LargeStringArray`, instead got {arr.type}"
+        )
+
+    validity, offsets, data = (
+        b"" if buf is None else memoryview(buf).cast("B") for buf in arr.buffers()
+    )
+    return validity or None, offsets, data, arr.offset, len(arr), large
+
+
+def _arrow_validity(arr: _pa.Array) -> _pa.Buffer | None:
+    """Validity bitmap of `arr` re-aligned to offset 0"""
+
+    if not arr.null_count:
+        return None
+    if not arr.offset:
+        return arr.buffers()[0]
+    return arr.is_valid().buffers()[1]
+
+
+def _arrow_strings(
+    arr: ArrowStrings,
+    kernel: callable,
+    func: str,
+    *args: object,
+) -> ArrowStrings:
+    """Apply a cython string `kernel` to every chunk of `arr`"""
+
+    if isinstance(arr, _pa.ChunkedArray):
+        return _pa.chunked_array(
+            [_arrow_strings(chunk, kernel, func, *args) for chunk in arr.chunks],
+            type=arr.type,
+        )
+
+    _, src_offsets, data, offset, length, large = _arrow_buffers(arr, func)
+    offsets, data, offset = kernel(src_offsets, data, offset, length, large, *args)
+    if offsets is src_offsets:
+        return arr
+    return _pa.Array.from_buffers(
+        arr.type,
+        length,
+        [_arrow_validity(arr), _pa.py_buffer(offsets), _pa.py_buffer(data)],
+        arr.null_count,
+    )
+
+
+# Parse Float (Arrow)
+def arrow_parse_float(
+    arr: ArrowStrings,
+    signed: bool = False,
+) -> _pa.DoubleArray | _pa.ChunkedArray:
+    """Parse floats from a pyarrow string array
+
+    Same rules as `parse_float`, applied directly on the Arrow buffers.
+    Only ASCII digits are recognized. Null values are kept as null.
+
+    :param arr: `StringArray`, `LargeStringArray` or `ChunkedArray` of them
+    :param signed: whether the floats are signed or not
+    :return: `DoubleArray` (or `ChunkedArray` of `DoubleArray`)
+    """
+
+    if isinstance(arr, _pa.ChunkedArray):
+        return _pa.chunked_array(
+            [arrow_parse_float(chunk, signed) for chunk in arr.chunks],
+            type=_pa.float64(),
+        )
+
+    validity, offsets, data, offset, length, large = _arrow_buffers(
+        arr, "arrow_parse_float"
+    )
+    try:
+        values = _arrow_parse_float(
+            offsets, data, offset, length, large, validity, signed
+        )
+    except Exception as err:
+        err.add_note(
+            f"<str_util.arrow_parse_float> Failed to parse float from {arr.type} array"
+        )
+        raise
+    return _pa.Array.from_buffers(
+        _pa.float64(),
+        length,
+        [_arrow_validity(arr), _pa.py_buffer(values)],
+        arr.null_count,
+    )
+
+
+# Remove double spaces (Arrow)
+def arrow_remove_double_spaces(arr: ArrowStrings) -> ArrowStrings:
+    """Remove all double spaces from a pyarrow string array
+
+    Same as `remove_double_spaces` applied to every value, except that only
+    ASCII whitespace is stripped from both ends. Null values are kept as null.
+
+    :param arr: `StringArray`, `LargeStringArray` or `ChunkedArray` of them
+    :return: array of the same type with all double spaces removed
+    """
+
+    return _arrow_strings(
+        arr, _arrow_remove_double_spaces, "arrow_remove_double_spaces"
+    )
+
+
+# Replace chars (Arrow)
+def arrow_replace_chars(
+    arr: ArrowStrings,
+    repl_char: str,
+    *targ_chars: str,
+    iterative: bool = True,
+) -> ArrowStrings:
+    """Replace all target chars with replacement char in a pyarrow string array
+
+    Same as `replace_chars` applied to every value. Null values are kept as null.
+
+    :param arr: `StringArray`, `LargeStringArray` or `ChunkedArray` of them
+    :param repl_char: replacement char
+    :param targ_chars: target chars to be replaced
+    :param iterative: whether to iterate until no target chars are found
+    :return: array of the same type with all target chars replaced
+    """
+
+    return _arrow_strings(
+        arr,
+        _arrow_replace_chars,
+        "arrow_replace_chars",
+        repl_char,
+        targ_chars,
+        iterative,
+    )
+
+
+# Extract [a-zA-Z0-9_] (Arrow)
+def arrow_extract_alphanum(arr: ArrowStrings) -> ArrowStrings:
+    """Extract all [a-zA-Z0-9_] from a pyarrow string array
+
+    :param arr: `StringArray`, `LargeStringArray` or `ChunkedArray` of them
+    :return: array of the same type with only [a-zA-Z0-9_] kept
+    """
+
+    return _arrow_strings(arr, _arrow_extract_alphanum, "arrow_extract_alphanum")
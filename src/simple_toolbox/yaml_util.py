@@ -1,40 +1,160 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
-from yaml import safe_load as _safe_load, safe_dump as _safe_dump
+import os
+import marshal as _marshal
+from copy import deepcopy as _deepcopy
+from hashlib import blake2b as _blake2b
+from yaml import load as _load, dump as _dump
+from simple_toolbox.file_util import atomic_write as _atomic_write
 
-__all__ = ["load", "save"]
+try:
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
 
+__all__ = ["load", "save", "clear_cache"]
 
-def load(path: str, *, encoding: int = "utf-8") -> dict:
-    """Load `yaml` file from a `path`"""
+
+# Parsed documents by absolute path: (mtime_ns, size, digest, data)
+_CACHE: dict[str, tuple[int, int, bytes, object]] = {}
+# Persisted caches '<path>.cache' are `marshal`-ed (magic, *entry): unlike a
+# pickle, loading one can't run code, whoever wrote the file.
+_CACHE_MAGIC: bytes = b"YAMLCACHE1"
+
+
+def load(
+    path: str,
+    *,
+    encoding: int = "utf-8",
+    cache: bool = False,
+    persist: bool = False,
+    copy: bool = True,
+) -> dict:
+    """Load `yaml` file from a `path`
+
+    Parsed with the libyaml `CSafeLoader` when available.
+
+    :param cache: keep the parsed document in memory, it is reused while
+        the file's mtime and size are unchanged, or (when they changed)
+        while the hash of its content is unchanged
+    :param persist: also keep the cache in a file next to the file
+        ('<path>.cache', written with `marshal`, which only restores plain
+        data), so new processes skip parsing as well. Documents holding
+        other types (e.g. timestamps parsed to `datetime`) aren't persisted
+    :param copy: return a deep copy of a cached document, so callers
+        may modify it
+    """
 
     if not path.endswith(".yaml"):
         path += ".yaml"
 
     try:
+        if cache or persist:
+            data = _load_cached(path, encoding, persist)
+            return _deepcopy(data) if copy else data
         with open(path, "r", encoding=encoding) as file:
-            return _safe_load(file)
+            return _load(file, Loader=_SafeLoader)
     except Exception as err:
         err.add_note(f"<yaml_util.load> Unable to load yaml from: '{path}'")
         raise
 
 
+def _load_cached(path: str, encoding: str, persist: bool) -> object:
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    entry = _CACHE.get(key)
+    if entry is None and persist:
+        entry = _load_persisted(key)
+
+    # unchanged file
+    if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+        _CACHE[key] = entry
+        return entry[3]
+
+    # touched file, unchanged content
+    with open(key, "rb") as file:
+        content = file.read()
+    digest = _blake2b(content, digest_size=16).digest()
+    if entry is not None and entry[2] == digest:
+        data = entry[3]
+    else:
+        data = _load(content.decode(encoding), Loader=_SafeLoader)
+
+    entry = (stat.st_mtime_ns, stat.st_size, digest, data)
+    _CACHE[key] = entry
+    if persist:
+        _save_persisted(key, entry)
+    return data
+
+
+def _load_persisted(key: str) -> tuple | None:
+    try:
+        with open(key + ".cache", "rb") as file:
+            magic, *entry = _marshal.load(file)
+    except Exception:
+        # missing or unreadable cache, parse the file
+        return None
+    return tuple(entry) if magic == _CACHE_MAGIC and len(entry) == 4 else None
+
+
+def _save_persisted(key: str, entry: tuple) -> None:
+    try:
+        content = _marshal.dumps((_CACHE_MAGIC, *entry))
+    except ValueError:
+        # types marshal can't write, drop a stale cache instead
+        try:
+            os.remove(key + ".cache")
+        except FileNotFoundError:
+            pass
+        return None
+    with _atomic_write(key + ".cache") as file:
+        file.write(content)
+
+
+def clear_cache(path: str = None) -> None:
+    """Drop cached documents (of one `path`, or all), persisted caches
+    are kept and revalidated on the next load
+    """
+
+    if path is None:
+        _CACHE.clear()
+        return None
+
+    if not path.endswith(".yaml"):
+        path += ".yaml"
+    _CACHE.pop(os.path.abspath(path), None)
+
+
 def save(
     data: dict,
     path: str,
     *,
     encoding: str = "utf-8",
     default_flow_style: bool = False,
+    fsync: bool = False,
+    lock: bool = False,
 ) -> None:
-    """Save `yaml` object to a file (path)"""
+    """Save `yaml` object to a file (path), atomically
+    (see `file_util.atomic_write`)
+
+    Emitted with the libyaml `CSafeDumper` when available.
+
+    :param fsync: flush the file to disk before returning
+    :param lock: hold a file lock while writing, for multi-process writers
+    """
 
     if not path.endswith(".yaml"):
         path += ".yaml"
 
     try:
-        with open(path, "w", encoding=encoding) as file:
-            _safe_dump(
-                data, file, encoding=encoding, default_flow_style=default_flow_style
+        # the binary stream makes the dumper encode with `encoding`
+        with _atomic_write(path, fsync=fsync, lock=lock) as file:
+            _dump(
+                data,
+                file,
+                Dumper=_SafeDumper,
+                encoding=encoding,
+                default_flow_style=default_flow_style,
             )
     except Exception as err:
         err.add_note(f"<yaml_util.save> Unable to save yaml to: '{path}'")
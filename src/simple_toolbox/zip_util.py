@@ -1,16 +1,142 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 import os as _os
+import sys as _sys
+import zlib as _zlib
 import zipfile as _zipfile
+from io import BytesIO as _BytesIO
+from time import mktime as _mktime
+from threading import local as _local
+from shutil import copyfileobj as _copyfileobj
+from collections import deque as _deque
+from typing import Callable as _Callable, Iterable as _Iterable
+from typing import Iterator as _Iterator, BinaryIO as _BinaryIO
+from concurrent.futures import Future as _Future, ThreadPoolExecutor as _ThreadPool
+from simple_toolbox.file_util import atomic_write as _atomic_write
 
-__all__ = ["zip_folder"]
+__all__ = ["zip_folder", "unzip", "iter_members"]
 
 
-def zip_folder(src: str, dst: str) -> str:
+# Extensions of already-compressed formats, stored as-is (ZIP_STORED)
+# fmt: off
+_COMPRESSED_EXTS: frozenset[str] = frozenset(
+    {
+        # archives
+        ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".lz4", ".7z", ".rar",
+        ".jar", ".whl", ".apk",
+        # documents
+        ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".epub", ".parquet",
+        # media
+        ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".avif",
+        ".mp3", ".aac", ".ogg", ".flac", ".m4a", ".opus",
+        ".mp4", ".mkv", ".mov", ".avi", ".webm", ".woff", ".woff2",
+    }
+)
+# fmt: on
+
+
+class _Deflated:
+    """Stands in for the compressor of a zip write handle, whose data
+    is deflated beforehand by the thread pool"""
+
+    @staticmethod
+    def flush() -> bytes:
+        return b""
+
+
+# Blocks deflated by the thread pool are written through the private state of
+# zipfile's write handle (`_ZipWriteFile`). This is only done on the Python
+# versions it was written for, and once a probe archive written this way has
+# passed `testzip()`, otherwise zipfile compresses the blocks itself.
+_FAST_DEFLATE_VERSIONS: tuple[tuple[int, int], tuple[int, int]] = ((3, 8), (3, 13))
+_FAST_DEFLATE: bool | None = None
+
+
+def _fast_deflate() -> bool:
+    global _FAST_DEFLATE
+    if _FAST_DEFLATE is None:
+        low, high = _FAST_DEFLATE_VERSIONS
+        _FAST_DEFLATE = low <= _sys.version_info[:2] <= high and _probe_fast_deflate()
+    return _FAST_DEFLATE
+
+
+def _probe_fast_deflate() -> bool:
+    data = bytes(range(256)) * 256
+    size = len(data) // 2
+    zinfo = _zipfile.ZipInfo("probe")
+    zinfo.compress_type = _zipfile.ZIP_DEFLATED
+    zinfo.file_size = len(data)
+    buffer = _BytesIO()
+    try:
+        with _zipfile.ZipFile(buffer, "w") as ziph:
+            writer = _MemberWriter(ziph, True)
+            for offset in (0, size):
+                final = offset + size >= len(data)
+                block = data[offset : offset + size]
+                future = _Future()
+                future.set_result((block, _deflate(block, 6, final)))
+                writer.write(zinfo, future, final)
+        with _zipfile.ZipFile(buffer) as ziph:
+            return ziph.testzip() is None and ziph.read("probe") == data
+    except Exception:
+        return False
+
+
+def _read_block(path: str, offset: int, size: int) -> bytes:
+    with open(path, "rb") as file:
+        file.seek(offset)
+        return file.read(size)
+
+
+def _deflate_block(
+    path: str,
+    offset: int,
+    size: int,
+    level: int,
+    final: bool,
+) -> tuple[bytes, bytes]:
+    block = _read_block(path, offset, size)
+    return block, _deflate(block, level, final)
+
+
+def _deflate(block: bytes, level: int, final: bool) -> bytes:
+    # Each block is a raw deflate stream ending on a byte boundary (sync
+    # flush), so the blocks concatenate into one valid stream.
+    compressor = _zlib.compressobj(level, _zlib.DEFLATED, -15)
+    data = compressor.compress(block)
+    return data + compressor.flush(_zlib.Z_FINISH if final else _zlib.Z_SYNC_FLUSH)
+
+
+def zip_folder(
+    src: str,
+    dst: str,
+    *,
+    compression: int = _zipfile.ZIP_DEFLATED,
+    level: int | None = None,
+    store_compressed: bool = True,
+    workers: int | None = None,
+    block_size: int = 1 << 22,
+) -> str:
     """Compress a folder to a zip file
 
+    Deflated members are compressed in blocks of `block_size` on a thread
+    pool (zlib releases the GIL) and written to the archive in order, so
+    only about `2 * workers` blocks are held in memory. On Python versions
+    this is not verified for, the pool only reads the blocks and zipfile
+    compresses them. Large archives and
+    members use ZIP64 extensions automatically. The archive is written to
+    a temporary file first, an error leaves no partial zip at `dst`.
+
     :param src: folder full directory to be compressed
     :param dst: the zip file full directory to be saved
+    :param compression: `zipfile.ZIP_DEFLATED`, `ZIP_STORED`, `ZIP_BZIP2` or
+        `ZIP_LZMA` (the latter two are compressed one member at a time)
+    :param level: compression level, e.g. 1 (fastest) to 9 (smallest) for
+        deflate, defaults to the library default
+    :param store_compressed: store files of already-compressed types
+        (.zip, .gz, .jpg, .mp4, .parquet ...) without compressing them again
+    :param workers: threads compressing blocks, defaults to the CPU count
+    :param block_size: bytes per compressed block
     :return: the zip file full directory
     """
 
@@ -18,22 +144,245 @@ def zip_folder(src: str, dst: str) -> str:
     if not dst.endswith(".zip"):
         dst += ".zip"
 
-    # zipfile handle
-    ziph = _zipfile.ZipFile(dst, "w", _zipfile.ZIP_DEFLATED)
-
-    # zip all files
+    workers = workers or _os.cpu_count() or 1
     try:
-        for root_dir, _, files in _os.walk(src):
-            for file in files:
-                ziph.write(
-                    _os.path.join(root_dir, file),
-                    _os.path.relpath(
-                        _os.path.join(root_dir, file), _os.path.join(src, "..")
-                    ),
-                )
+        # zip all files
+        with _atomic_write(dst) as file, _zipfile.ZipFile(
+            file, "w", compression, compresslevel=level
+        ) as ziph, _ThreadPool(workers) as pool:
+            members = []
+            for root_dir, _, files in _os.walk(src):
+                for name in files:
+                    path = _os.path.join(root_dir, name)
+                    arcname = _os.path.relpath(path, _os.path.join(src, ".."))
+                    members.append((path, arcname))
+
+            fast = _fast_deflate()
+            writer = _MemberWriter(ziph, fast)
+            pending: _deque[tuple] = _deque()
+            for block in _submit_blocks(
+                pool, members, compression, level, store_compressed, block_size, fast
+            ):
+                pending.append(block)
+                # write the oldest block, bounding the blocks in flight
+                if len(pending) >= workers * 2:
+                    writer.write(*pending.popleft())
+            while pending:
+                writer.write(*pending.popleft())
     except Exception as err:
         err.add_note(f"<zip_util.zip_folder> Unable to zip folder: '{src}' to: '{dst}'")
         raise
 
     # return zipfile path
     return dst
+
+
+def _submit_blocks(
+    pool: _ThreadPool,
+    members: list[tuple[str, str]],
+    compression: int,
+    level: int | None,
+    store_compressed: bool,
+    block_size: int,
+    fast: bool,
+) -> _Iterator[tuple[_zipfile.ZipInfo, _Future | str, bool]]:
+    for path, arcname in members:
+        zinfo = _zipfile.ZipInfo.from_file(path, arcname)
+        zinfo.compress_type = compression
+        # `ziph.open(zinfo, "w")` doesn't apply the archive's level
+        if hasattr(zinfo, "compress_level"):
+            zinfo.compress_level = level
+        else:
+            zinfo._compresslevel = level
+        if store_compressed and _os.path.splitext(path)[1].lower() in _COMPRESSED_EXTS:
+            zinfo.compress_type = _zipfile.ZIP_STORED
+
+        # bzip2 / lzma: written by zipfile when its turn comes
+        if zinfo.compress_type not in (_zipfile.ZIP_DEFLATED, _zipfile.ZIP_STORED):
+            yield zinfo, path, True
+            continue
+
+        offsets = range(0, zinfo.file_size, block_size) or range(1)
+        for offset in offsets:
+            final = offset + block_size >= zinfo.file_size
+            size = -1 if final else block_size
+            if zinfo.compress_type == _zipfile.ZIP_STORED or not fast:
+                future = pool.submit(_read_block, path, offset, size)
+            else:
+                future = pool.submit(
+                    _deflate_block,
+                    path,
+                    offset,
+                    size,
+                    _zlib.Z_DEFAULT_COMPRESSION if level is None else level,
+                    final,
+                )
+            yield zinfo, future, final
+
+
+class _MemberWriter:
+    """Write the blocks of members to a zip file, in order"""
+
+    def __init__(self, ziph: _zipfile.ZipFile, fast: bool) -> None:
+        self.__ziph: _zipfile.ZipFile = ziph
+        self.__fast: bool = fast
+        self.__handle = None
+        self.__crc: int = 0
+        self.__file_size: int = 0
+        self.__compress_size: int = 0
+
+    def write(
+        self,
+        zinfo: _zipfile.ZipInfo,
+        result: _Future | str,
+        final: bool,
+    ) -> None:
+        # bzip2 / lzma members are streamed from `path` by zipfile itself
+        if isinstance(result, str):
+            self.__ziph.write(result, zinfo.filename, zinfo.compress_type)
+            return None
+
+        if self.__handle is None:
+            self.__handle = self.__ziph.open(zinfo, "w")
+            self.__crc, self.__file_size, self.__compress_size = 0, 0, 0
+
+        handle = self.__handle
+        if zinfo.compress_type == _zipfile.ZIP_DEFLATED and self.__fast:
+            block, data = result.result()
+            # bypass the handle's compressor, keep its bookkeeping
+            handle._compressor = _Deflated
+            handle._fileobj.write(data)
+            self.__crc = _zlib.crc32(block, self.__crc)
+            self.__file_size += len(block)
+            self.__compress_size += len(data)
+            handle._crc, handle._file_size = self.__crc, self.__file_size
+            handle._compress_size = self.__compress_size
+        else:
+            handle.write(result.result())
+
+        if final:
+            handle.close()
+            self.__handle = None
+
+
+# Unzip --------------------------------------------------------------------------------
+def _select_members(
+    ziph: _zipfile.ZipFile,
+    members: _Iterable[str] | _Callable[[str], bool] | None,
+) -> list[_zipfile.ZipInfo]:
+    if members is None:
+        return ziph.infolist()
+    if callable(members):
+        return [info for info in ziph.infolist() if members(info.filename)]
+    return [ziph.getinfo(name) for name in members]
+
+
+def _member_path(dst: str, name: str) -> str:
+    # zip-slip guard: the resolved path must stay inside `dst`, which
+    # rejects absolute names, '..' parts and symlinks leading outside
+    path = _os.path.realpath(_os.path.join(dst, name))
+    if _os.path.commonpath((dst, path)) != dst or path == dst:
+        raise ValueError("Unsafe member path outside the destination: '%s'" % name)
+    return path
+
+
+def unzip(
+    src: str,
+    dst: str,
+    *,
+    members: _Iterable[str] | _Callable[[str], bool] | None = None,
+    workers: int | None = None,
+    chunk_size: int = 1 << 20,
+) -> list[str]:
+    """Extract a zip file to a folder
+
+    Members are extracted concurrently on a thread pool (every thread
+    reads through its own handle of the zip file), each streamed to disk
+    in chunks of `chunk_size`, so memory stays bounded regardless of the
+    member sizes. Members whose path would resolve outside of `dst`
+    (zip-slip) are rejected before anything is written.
+
+    :param src: the zip file full directory
+    :param dst: the folder full directory to extract to
+    :param members: names of the members to extract, or a function
+        selecting members by name, defaults to all members
+    :param workers: threads extracting members, defaults to the CPU count
+    :param chunk_size: bytes read per chunk
+    :return: paths of the extracted files
+    """
+
+    workers = workers or _os.cpu_count() or 1
+    try:
+        dst = _os.path.realpath(dst)
+        with _zipfile.ZipFile(src) as ziph:
+            infos = _select_members(ziph, members)
+        targets = [(info, _member_path(dst, info.filename)) for info in infos]
+
+        # directories first, so files can be written in any order
+        files = []
+        for info, path in targets:
+            if info.is_dir():
+                _os.makedirs(path, exist_ok=True)
+            else:
+                _os.makedirs(_os.path.dirname(path), exist_ok=True)
+                files.append((info, path))
+
+        local = _local()
+        handles: list[_zipfile.ZipFile] = []
+
+        def extract(member: tuple[_zipfile.ZipInfo, str]) -> str:
+            try:
+                ziph = local.ziph
+            except AttributeError:
+                ziph = local.ziph = _zipfile.ZipFile(src)
+                handles.append(ziph)
+            info, path = member
+            with ziph.open(info) as reader, open(path, "wb") as writer:
+                _copyfileobj(reader, writer, chunk_size)
+            mtime = _mktime(info.date_time + (0, 0, -1))
+            _os.utime(path, (mtime, mtime))
+            return path
+
+        try:
+            with _ThreadPool(workers) as pool:
+                return list(pool.map(extract, files))
+        finally:
+            for ziph in handles:
+                ziph.close()
+    except Exception as err:
+        err.add_note(f"<zip_util.unzip> Unable to unzip: '{src}' to: '{dst}'")
+        raise
+
+
+def iter_members(
+    src: str | _BinaryIO,
+    *,
+    members: _Iterable[str] | _Callable[[str], bool] | None = None,
+) -> _Iterator[tuple[_zipfile.ZipInfo, _BinaryIO]]:
+    """Stream the file members of a zip file, without extracting to disk
+
+    Each member is yielded as a binary file object, decompressed while it
+    is read, and closed once the next member is requested.
+
+    :param src: the zip file full directory, or a binary file object
+    :param members: names of the members, or a function selecting members
+        by name, defaults to all file members
+    :return: iterator of (`zipfile.ZipInfo`, file object)
+
+    :Example:
+    >>> for info, file in zip_util.iter_members("export.zip"):
+            if info.filename.endswith(".json"):
+                for row in json_util.iter_items(file):
+                    ...
+    """
+
+    try:
+        with _zipfile.ZipFile(src) as ziph:
+            for info in _select_members(ziph, members):
+                if info.is_dir():
+                    continue
+                with ziph.open(info) as file:
+                    yield info, file
+    except Exception as err:
+        err.add_note(f"<zip_util.iter_members> Unable to read members of: '{src}'")
+        raise